@@ -0,0 +1,147 @@
+import asyncio
+import importlib
+import os
+import random
+import tempfile
+import time
+from typing import List
+from telegram import Bot
+from telegram.error import Forbidden, NetworkError
+from telegram.request import HTTPXRequest
+from storage import StorageService, AsyncStorageService, ChatInfo, SubscriptionService
+from tgService import tgService
+from tgService.rateLimiter import BroadcastRateLimiter
+from .common import BenchResult, summarize
+from .fakeBotApi import FakeBotApi
+
+
+class FakeBot:
+    """Stands in for telegram.Bot: sleeps `latency` seconds per send and fails at `errorRate`"""
+
+    def __init__(self, latency: float, errorRate: float, seed: int = 0):
+        self.latency = latency
+        self.errorRate = errorRate
+        self._rng = random.Random(seed)
+        self.sendTimes: List[float] = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        startTime = time.perf_counter()
+        await asyncio.sleep(self.latency)
+        self.sendTimes.append(time.perf_counter() - startTime)
+        if self._rng.random() < self.errorRate:
+            # Mix of permanent and transient failures
+            raise Forbidden('Forbidden: bot was blocked by the user') if self._rng.random() < 0.5 else NetworkError('timed out')
+
+
+class _TimedBot:
+    """Wraps a real telegram.Bot and records how long every send_message call takes"""
+
+    def __init__(self, bot: Bot):
+        self._bot = bot
+        self.sendTimes: List[float] = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        startTime = time.perf_counter()
+        try:
+            await self._bot.send_message(chat_id=chat_id, text=text)
+        finally:
+            self.sendTimes.append(time.perf_counter() - startTime)
+
+
+class _FakeApplication:
+    def __init__(self, bot):
+        self.bot = bot
+
+
+async def _runBroadcast(size: int, latency: float, errorRate: float, rate: float) -> BenchResult:
+    tgModule = importlib.import_module('tgService.tgService')
+    with tempfile.TemporaryDirectory() as directory:
+        storage = StorageService(os.path.join(directory, 'chat_ids.csv'))
+        storage.saveChats([ChatInfo(chat_id=chat_id) for chat_id in range(1, size + 1)])
+
+        bot = FakeBot(latency, errorRate)
+        originalStorage, originalSubscriptions = tgModule.getAsyncStorageService, tgModule.getSubscriptionService
+        originalApp, originalLimiter = tgService._tgApp, tgService._rateLimiter
+        asyncStorage = AsyncStorageService(storage)
+        tgModule.getAsyncStorageService = lambda: asyncStorage
+        subscriptions = SubscriptionService(os.path.join(directory, 'subscriptions.json'))
+        tgModule.getSubscriptionService = lambda: subscriptions
+        tgService._tgApp = _FakeApplication(bot)
+        tgService._rateLimiter = BroadcastRateLimiter(globalRate=rate, perChatRate=1)
+        try:
+            startTime = time.perf_counter()
+            await tgService.sendCustomMessage('benchmark')
+            total = time.perf_counter() - startTime
+        finally:
+            tgModule.getAsyncStorageService, tgModule.getSubscriptionService = originalStorage, originalSubscriptions
+            tgService._tgApp, tgService._rateLimiter = originalApp, originalLimiter
+        deactivated = size - len(storage.getAllChatIds())
+
+    params = {'size': size, 'latency_s': latency, 'error_rate': errorRate, 'rate_per_s': rate}
+    return summarize('broadcast.sendCustomMessage', params, bot.sendTimes, total=total,
+                     deactivated=deactivated)
+
+
+async def _runEndToEndBroadcast(size: int, latency: float, errorRate: float, rate: float, retryAfterRate: float) -> BenchResult:
+    tgModule = importlib.import_module('tgService.tgService')
+    api = FakeBotApi(latency=latency, forbiddenRate=errorRate, retryAfterRate=retryAfterRate)
+    await api.start()
+    with tempfile.TemporaryDirectory() as directory:
+        storage = StorageService(os.path.join(directory, 'chat_ids.csv'))
+        storage.saveChats([ChatInfo(chat_id=chat_id) for chat_id in range(1, size + 1)])
+
+        # The real client stack (httpx, JSON parsing, error mapping) against the local server
+        bot = Bot('123:benchmark', base_url=api.baseUrl, request=HTTPXRequest(connection_pool_size=256))
+        timedBot = _TimedBot(bot)
+        originalStorage, originalSubscriptions = tgModule.getAsyncStorageService, tgModule.getSubscriptionService
+        originalApp, originalLimiter = tgService._tgApp, tgService._rateLimiter
+        asyncStorage = AsyncStorageService(storage)
+        tgModule.getAsyncStorageService = lambda: asyncStorage
+        subscriptions = SubscriptionService(os.path.join(directory, 'subscriptions.json'))
+        tgModule.getSubscriptionService = lambda: subscriptions
+        tgService._tgApp = _FakeApplication(timedBot)
+        tgService._rateLimiter = BroadcastRateLimiter(globalRate=rate, perChatRate=1)
+        try:
+            await bot.initialize()
+            startTime = time.perf_counter()
+            await tgService.sendCustomMessage('benchmark')
+            total = time.perf_counter() - startTime
+        finally:
+            tgModule.getAsyncStorageService, tgModule.getSubscriptionService = originalStorage, originalSubscriptions
+            tgService._tgApp, tgService._rateLimiter = originalApp, originalLimiter
+            await bot.shutdown()
+            await api.stop()
+        deactivated = size - len(storage.getAllChatIds())
+
+    params = {'size': size, 'latency_s': latency, 'error_rate': errorRate, 'rate_per_s': rate, 'retry_after_rate': retryAfterRate}
+    return summarize('broadcast.endToEnd', params, timedBot.sendTimes, total=total, deactivated=deactivated,
+                     delivered=sum(len(messages) for messages in api.sentMessages.values()),
+                     retry_after=api.stats['retry_after'])
+
+
+def runBroadcastBenchmarks(sizes: List[int], latency: float, errorRate: float, rate: float) -> List[BenchResult]:
+    """
+    Time TgService.sendCustomMessage against a fake bot
+
+    Args:
+        sizes: Numbers of subscribed chats
+        latency: Seconds every fake send takes
+        errorRate: Share of sends that fail
+        rate: Global send rate limit, messages per second
+    """
+    return [asyncio.run(_runBroadcast(size, latency, errorRate, rate)) for size in sizes]
+
+
+def runEndToEndBroadcastBenchmarks(sizes: List[int], latency: float, errorRate: float, rate: float,
+                                   retryAfterRate: float = 0.0) -> List[BenchResult]:
+    """
+    Time TgService.sendCustomMessage through a real telegram.Bot talking HTTP to FakeBotApi
+
+    Args:
+        sizes: Numbers of subscribed chats
+        latency: Seconds the fake server takes per call
+        errorRate: Share of chats that answer 403
+        rate: Global send rate limit, messages per second
+        retryAfterRate: Share of sends answered with 429
+    """
+    return [asyncio.run(_runEndToEndBroadcast(size, latency, errorRate, rate, retryAfterRate)) for size in sizes]
@@ -0,0 +1,53 @@
+import statistics
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List
+
+
+@dataclass
+class BenchResult:
+    """One measured operation, serialized as-is into the JSON report"""
+    benchmark: str
+    params: Dict[str, Any]
+    ops: int
+    total_s: float
+    mean_ms: float
+    p50_ms: float
+    p99_ms: float
+    ops_per_s: float
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def summarize(benchmark: str, params: Dict[str, Any], samples: List[float], total: float = None, **extra) -> BenchResult:
+    """
+    Build a result from per-operation durations in seconds
+
+    Args:
+        total: Wall time of all operations, the sum of samples if None
+            (differs when operations ran concurrently)
+    """
+    total = sum(samples) if total is None else total
+    ordered = sorted(samples)
+    return BenchResult(
+        benchmark=benchmark,
+        params=params,
+        ops=len(samples),
+        total_s=round(total, 6),
+        mean_ms=round(statistics.fmean(samples) * 1000, 4) if samples else 0.0,
+        p50_ms=round(ordered[len(ordered) // 2] * 1000, 4) if samples else 0.0,
+        p99_ms=round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 4) if samples else 0.0,
+        ops_per_s=round(len(samples) / total, 2) if total else 0.0,
+        extra=extra
+    )
+
+
+def timeCalls(func, argsList) -> List[float]:
+    samples = []
+    for args in argsList:
+        startTime = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - startTime)
+    return samples
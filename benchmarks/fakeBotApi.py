@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Telegram Bot API, for load and latency testing.
+
+Implements getMe, getUpdates, sendMessage, setWebhook and deleteWebhook with
+configurable latency, 429 retry_after injection and 403 responses. Point the
+bot at it with `telegram-api-base-url: 'http://127.0.0.1:8081/bot'`. Once the
+bot registers a webhook, postUpdate delivers updates to it as Telegram does.
+
+Usage:
+    python -m benchmarks.fakeBotApi --port 8081 --latency 0.05 --retry-after-rate 0.01
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qs
+import httpx
+from utils import styler
+from utils.httpServer import HttpServer, HttpRequest, HttpResponse
+
+
+class FakeBotApi:
+    """
+    In-process fake Bot API server
+
+    Args:
+        latency: Seconds every method call takes
+        retryAfterRate: Share of sendMessage calls answered with 429
+        retryAfterSeconds: retry_after value of injected 429 responses
+        forbiddenRate: Share of chats that blocked the bot (decided once per chat)
+        forbiddenChatIds: Chats that always get 403
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, retryAfterRate: float = 0.0,
+                 retryAfterSeconds: int = 1, forbiddenRate: float = 0.0, forbiddenChatIds: Optional[Set[int]] = None, seed: int = 0):
+        self.latency = latency
+        self.retryAfterRate = retryAfterRate
+        self.retryAfterSeconds = retryAfterSeconds
+        self.forbiddenRate = forbiddenRate
+        self.forbiddenChatIds = set(forbiddenChatIds or ())
+        self.webhookUrl = ''
+        self.webhookSecret = ''
+        self.stats = Counter()
+        self.sentMessages: Dict[int, List[str]] = {}
+
+        self._rng = random.Random(seed)
+        self._server = HttpServer(host, port)
+        self._server.fallback(self._handle)
+        self._server.route('GET', '/stats', self._handleStats)
+        self._messageIds = itertools.count(1)
+        self._updateIds = itertools.count(1)
+        self._updates: List[Dict[str, Any]] = []
+        self._updatesAvailable = asyncio.Event()
+        self._decidedChats: Dict[int, bool] = {}
+        self._webhookClient: Optional[httpx.AsyncClient] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.port
+
+    @property
+    def baseUrl(self) -> str:
+        """Value for `telegram-api-base-url`"""
+        return f"http://{self._server.host}:{self.port}/bot"
+
+    async def start(self) -> None:
+        await self._server.start()
+
+    async def stop(self) -> None:
+        if self._webhookClient is not None:
+            await self._webhookClient.aclose()
+            self._webhookClient = None
+        await self._server.stop()
+
+    def pushUpdate(self, chatId: int, text: str, firstName: str = 'Test') -> None:
+        """Queue an incoming text message, delivered through getUpdates"""
+        self._updates.append(self._buildUpdate(chatId, text, firstName))
+        self._updatesAvailable.set()
+
+    async def postUpdate(self, chatId: int, text: str, firstName: str = 'Test', secretToken: Optional[str] = None) -> int:
+        """
+        POST an incoming text message to the registered webhook
+
+        Args:
+            secretToken: Secret token header to send, the one given to setWebhook if None
+
+        Returns:
+            int: HTTP status the webhook answered with
+        """
+        if not self.webhookUrl:
+            raise RuntimeError("No webhook is registered")
+        headers = {'X-Telegram-Bot-Api-Secret-Token': self.webhookSecret if secretToken is None else secretToken}
+        if self._webhookClient is None:
+            self._webhookClient = httpx.AsyncClient()
+        response = await self._webhookClient.post(self.webhookUrl, json=self._buildUpdate(chatId, text, firstName), headers=headers)
+        self.stats['webhook_posts'] += 1
+        return response.status_code
+
+    def _buildUpdate(self, chatId: int, text: str, firstName: str) -> Dict[str, Any]:
+        user = {'id': chatId, 'is_bot': False, 'first_name': firstName}
+        return {
+            'update_id': next(self._updateIds),
+            'message': {
+                'message_id': next(self._messageIds),
+                'date': int(time.time()),
+                'chat': {'id': chatId, 'type': 'private', 'first_name': firstName},
+                'from': user,
+                'text': text,
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}] if text.startswith('/') else []
+            }
+        }
+
+    @staticmethod
+    def _parseParams(request: HttpRequest) -> Dict[str, Any]:
+        if not request.body:
+            return dict((key, values[-1]) for key, values in parse_qs(request.query).items())
+        if request.headers.get('content-type', '').startswith('application/json'):
+            return json.loads(request.body)
+        params = {}
+        for key, values in parse_qs(request.body.decode('utf-8')).items():
+            value = values[-1]
+            try:
+                params[key] = json.loads(value)
+            except ValueError:
+                params[key] = value
+        return params
+
+    @staticmethod
+    def _reply(result: Any = None, errorCode: int = 0, description: str = '', parameters: Optional[Dict] = None) -> HttpResponse:
+        if errorCode:
+            body = {'ok': False, 'error_code': errorCode, 'description': description}
+            if parameters:
+                body['parameters'] = parameters
+            return HttpResponse(status=errorCode, body=json.dumps(body).encode(), contentType='application/json')
+        return HttpResponse(body=json.dumps({'ok': True, 'result': result}).encode(), contentType='application/json')
+
+    async def _handle(self, request: HttpRequest) -> HttpResponse:
+        # Paths look like /bot<token>/<method>
+        parts = request.path.strip('/').split('/')
+        if len(parts) != 2 or not parts[0].startswith('bot'):
+            return self._reply(errorCode=404, description='Not Found')
+        method = parts[1]
+        params = self._parseParams(request)
+        self.stats[method] += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        handler = getattr(self, f"_method_{method}", None)
+        if handler is None:
+            return self._reply(errorCode=404, description='Not Found: method not found')
+        return await handler(params)
+
+    async def _handleStats(self, request: HttpRequest) -> HttpResponse:
+        body = {'calls': dict(self.stats), 'chats': len(self.sentMessages)}
+        return HttpResponse(body=json.dumps(body).encode(), contentType='application/json')
+
+    async def _method_getMe(self, params: Dict[str, Any]) -> HttpResponse:
+        return self._reply({'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot',
+                            'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False})
+
+    async def _method_getUpdates(self, params: Dict[str, Any]) -> HttpResponse:
+        offset = int(params.get('offset') or 0)
+        self._updates = [update for update in self._updates if update['update_id'] >= offset]
+        if not self._updates:
+            self._updatesAvailable.clear()
+            try:
+                await asyncio.wait_for(self._updatesAvailable.wait(), float(params.get('timeout') or 0))
+            except asyncio.TimeoutError:
+                pass
+        return self._reply(self._updates[:int(params.get('limit') or 100)])
+
+    async def _method_sendMessage(self, params: Dict[str, Any]) -> HttpResponse:
+        chatId = int(params['chat_id'])
+        if chatId not in self._decidedChats:
+            self._decidedChats[chatId] = chatId in self.forbiddenChatIds or self._rng.random() < self.forbiddenRate
+        if self._decidedChats[chatId]:
+            self.stats['forbidden'] += 1
+            return self._reply(errorCode=403, description='Forbidden: bot was blocked by the user')
+        if self._rng.random() < self.retryAfterRate:
+            self.stats['retry_after'] += 1
+            return self._reply(errorCode=429, description=f'Too Many Requests: retry after {self.retryAfterSeconds}',
+                               parameters={'retry_after': self.retryAfterSeconds})
+
+        self.sentMessages.setdefault(chatId, []).append(params.get('text', ''))
+        return self._reply({
+            'message_id': next(self._messageIds),
+            'date': int(time.time()),
+            'chat': {'id': chatId, 'type': 'private'},
+            'text': params.get('text', '')
+        })
+
+    async def _method_setWebhook(self, params: Dict[str, Any]) -> HttpResponse:
+        self.webhookUrl = params.get('url', '')
+        self.webhookSecret = params.get('secret_token', '')
+        return self._reply(True)
+
+    async def _method_deleteWebhook(self, params: Dict[str, Any]) -> HttpResponse:
+        self.webhookUrl = ''
+        self.webhookSecret = ''
+        return self._reply(True)
+
+
+async def _serve(args) -> None:
+    api = FakeBotApi(args.host, args.port, latency=args.latency, retryAfterRate=args.retry_after_rate,
+                     retryAfterSeconds=args.retry_after, forbiddenRate=args.forbidden_rate)
+    await api.start()
+    styler.info(f"Fake Bot API ready, set telegram-api-base-url: '{api.baseUrl}'")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds every call takes')
+    parser.add_argument('--retry-after-rate', type=float, default=0.0, help='Share of sendMessage calls answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after seconds of injected 429 responses')
+    parser.add_argument('--forbidden-rate', type=float, default=0.0, help='Share of chats answering 403')
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import asyncio
+import shutil
+import time
+from typing import List
+from utils.probeBackends import IcmpProbeBackend, SubprocessPingBackend, TcpProbeBackend
+from .common import BenchResult, summarize
+
+
+async def _acceptAndClose(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    writer.close()
+
+
+async def _runProbes(backend, address: str, probes: int, concurrency: int) -> BenchResult:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    failures = 0
+
+    async def probeOnce():
+        nonlocal failures
+        async with semaphore:
+            startTime = time.perf_counter()
+            if not await backend.probe(address, 1, 1):
+                failures += 1
+            samples.append(time.perf_counter() - startTime)
+
+    startTime = time.perf_counter()
+    await asyncio.gather(*(probeOnce() for _ in range(probes)))
+    total = time.perf_counter() - startTime
+    backend.close()
+
+    params = {'backend': backend.name, 'probes': probes, 'concurrency': concurrency}
+    return summarize('probe.loopback', params, samples, total=total, failures=failures)
+
+
+async def _runAll(probes: int, concurrency: int) -> List[BenchResult]:
+    results = []
+
+    server = await asyncio.start_server(_acceptAndClose, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    results.append(await _runProbes(TcpProbeBackend([port]), '127.0.0.1', probes, concurrency))
+    server.close()
+    await server.wait_closed()
+
+    try:
+        IcmpProbeBackend.openSocket()[0].close()
+        results.append(await _runProbes(IcmpProbeBackend(), '127.0.0.1', probes, concurrency))
+    except OSError:
+        pass  # ICMP sockets are not permitted here
+
+    if shutil.which('ping'):
+        results.append(await _runProbes(SubprocessPingBackend(), '127.0.0.1', probes, concurrency))
+    return results
+
+
+def runProbeBenchmarks(probes: int, concurrency: int) -> List[BenchResult]:
+    """Measure probe throughput of every available backend against loopback"""
+    return asyncio.run(_runAll(probes, concurrency))
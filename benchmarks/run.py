@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the storage, probing and broadcast hot paths.
+
+Usage:
+    python -m benchmarks.run --sizes 1000 100000 --output bench.json
+    python -m benchmarks.run --suites e2e --broadcast-sizes 1000 --retry-after-rate 0.01
+    python -m benchmarks.run --suites webhook --webhook-updates 500
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from config import config
+from utils import styler
+from .storageBench import runStorageBenchmarks, BACKENDS
+from .probeBench import runProbeBenchmarks
+
+
+def _gitRevision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suites', nargs='+', default=['storage', 'broadcast', 'probe'],
+                        choices=['storage', 'broadcast', 'e2e', 'probe', 'webhook'])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000], help='Subscriber counts, up to 1000000')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS, help='Storage backends')
+    parser.add_argument('--ops', type=int, default=1000, help='Operations per storage measurement')
+    parser.add_argument('--rewrite-ops', type=int, default=10, help='deactivate_chat_id calls per measurement')
+    parser.add_argument('--broadcast-sizes', nargs='+', type=int, default=[1000, 10000])
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake send latency, seconds')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='Share of fake sends that fail')
+    parser.add_argument('--retry-after-rate', type=float, default=0.0, help='Share of sends answered with 429 in the e2e suite')
+    parser.add_argument('--rate', type=float, default=1000, help='Global send rate limit for the broadcast benchmark')
+    parser.add_argument('--probes', type=int, default=500)
+    parser.add_argument('--probe-concurrency', type=int, default=50)
+    parser.add_argument('--webhook-updates', type=int, default=200, help='Updates POSTed to the webhook listener')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    # Keep per-operation log lines out of the measurements and out of the report
+    styler.configure(level='ERROR', stream=sys.stderr)
+    # Defaults for every option instead of the local config.yaml, so results do
+    # not depend on it and a clean checkout without one can run them
+    config.replace({})
+
+    results = []
+    startTime = time.perf_counter()
+    if 'storage' in args.suites:
+        results += runStorageBenchmarks(args.sizes, args.ops, args.rewrite_ops, args.backends)
+    if 'broadcast' in args.suites or 'e2e' in args.suites:
+        # The Telegram stack is only imported for the suites that use it
+        from .broadcastBench import runBroadcastBenchmarks, runEndToEndBroadcastBenchmarks
+    if 'broadcast' in args.suites:
+        results += runBroadcastBenchmarks(args.broadcast_sizes, args.latency, args.error_rate, args.rate)
+    if 'e2e' in args.suites:
+        results += runEndToEndBroadcastBenchmarks(args.broadcast_sizes, args.latency, args.error_rate, args.rate,
+                                                  args.retry_after_rate)
+    if 'probe' in args.suites:
+        results += runProbeBenchmarks(args.probes, args.probe_concurrency)
+    if 'webhook' in args.suites:
+        from .webhookBench import runWebhookBenchmarks
+        results += runWebhookBenchmarks(args.webhook_updates)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _gitRevision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'duration_s': round(time.perf_counter() - startTime, 3)
+        },
+        'results': [result.to_dict() for result in results]
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import csv
+import os
+import random
+import tempfile
+import time
+from typing import List
+from storage import StorageService, JournalStorageService, SqliteStorageService
+from storage.storageService import FIELDNAMES
+from .common import BenchResult, summarize, timeCalls
+
+BACKENDS = ('csv', 'journal', 'sqlite')
+
+
+def generateChatsCsv(path: str, size: int, inactiveRatio: float = 0.05) -> None:
+    """Write a synthetic chat_ids.csv with `size` chats"""
+    rng = random.Random(size)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(FIELDNAMES)
+        for chat_id in range(1, size + 1):
+            writer.writerow([
+                chat_id, f"user{chat_id}", f"First{chat_id}", f"Last{chat_id}",
+                '2025-01-01 00:00:00', str(rng.random() >= inactiveRatio)
+            ])
+
+
+def _openStorage(backend: str, directory: str, csvPath: str):
+    if backend == 'csv':
+        return StorageService(csvPath)
+    if backend == 'journal':
+        return JournalStorageService(csvPath)
+    return SqliteStorageService(os.path.join(directory, 'chats.sqlite3'), csvPath)
+
+
+def runStorageBenchmarks(sizes: List[int], ops: int, rewriteOps: int, backends=BACKENDS) -> List[BenchResult]:
+    """
+    Measure StorageService hot paths on synthetic subscriber sets
+
+    Args:
+        sizes: Numbers of chats to generate
+        ops: Operations per measurement for cheap operations
+        rewriteOps: Operations for deactivate_chat_id, which may rewrite the whole file
+    """
+    results = []
+    for backend in backends:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                csvPath = os.path.join(directory, 'chat_ids.csv')
+                generateChatsCsv(csvPath, size)
+                params = {'backend': backend, 'size': size}
+                rng = random.Random(0)
+
+                startTime = time.perf_counter()
+                storage = _openStorage(backend, directory, csvPath)
+                storage.getAllChatIds()
+                results.append(summarize('storage.load', params, [time.perf_counter() - startTime]))
+
+                newIds = [(size + 1 + index, f"new{index}") for index in range(ops)]
+                results.append(summarize('storage.saveChat', params, timeCalls(storage.saveChat, newIds)))
+
+                results.append(summarize('storage.getAllChatIds', params, timeCalls(storage.getAllChatIds, [()] * ops)))
+
+                lookups = [(rng.randint(1, size),) for _ in range(ops)]
+                results.append(summarize('storage.get_chat_info', params, timeCalls(storage.get_chat_info, lookups)))
+
+                deactivations = [(chat_id,) for chat_id in rng.sample(range(1, size + 1), min(rewriteOps, size))]
+                results.append(summarize('storage.deactivate_chat_id', params, timeCalls(storage.deactivate_chat_id, deactivations)))
+
+                if backend == 'sqlite':
+                    storage.close()
+                if backend == 'journal' and storage._compactionThread:
+                    storage._compactionThread.join()
+    return results
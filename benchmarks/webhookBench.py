@@ -0,0 +1,78 @@
+import asyncio
+import time
+from typing import Dict, List
+from telegram import Update
+from telegram.ext import Application, ContextTypes, MessageHandler, filters
+from utils.httpServer import HttpServer
+from .common import BenchResult, summarize
+from .fakeBotApi import FakeBotApi
+
+WEBHOOK_PATH = '/telegram'
+WEBHOOK_SECRET = 'benchmark-secret'
+
+
+async def _runWebhook(updates: int) -> BenchResult:
+    # Imported here, only the suites talking to Telegram load its stack
+    from tgService.tgService import TgService
+
+    api = FakeBotApi()
+    await api.start()
+    application = Application.builder().token('123:benchmark').base_url(api.baseUrl).concurrent_updates(True).build()
+    handled: Dict[int, float] = {}
+    allHandled = asyncio.Event()
+
+    async def onMessage(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        handled[update.effective_chat.id] = time.perf_counter()
+        if len(handled) == updates:
+            allHandled.set()
+
+    application.add_handler(MessageHandler(filters.ALL, onMessage))
+
+    # The listener of startWebhook, without the config and the bot commands
+    worker = TgService()
+    worker._tgApp = application
+    worker._webhookSecret = WEBHOOK_SECRET
+    server = HttpServer('127.0.0.1', 0)
+    server.route('POST', WEBHOOK_PATH, worker._handleWebhookRequest)
+    await server.start()
+    await application.initialize()
+    await application.start()
+    try:
+        await application.bot.set_webhook(url=f"http://127.0.0.1:{server.port}{WEBHOOK_PATH}", secret_token=WEBHOOK_SECRET)
+
+        rejectedStatus = await api.postUpdate(0, '/start', secretToken='wrong-secret')
+        await asyncio.sleep(0.1)
+        if rejectedStatus != 403 or handled:
+            raise RuntimeError(f"Webhook accepted a wrong secret token (HTTP {rejectedStatus})")
+
+        sentAt: Dict[int, float] = {}
+        startTime = time.perf_counter()
+        for chatId in range(1, updates + 1):
+            sentAt[chatId] = time.perf_counter()
+            status = await api.postUpdate(chatId, '/status')
+            if status != 200:
+                raise RuntimeError(f"Webhook rejected a valid update (HTTP {status})")
+        await asyncio.wait_for(allHandled.wait(), 30)
+        total = time.perf_counter() - startTime
+    finally:
+        await application.stop()
+        await application.shutdown()
+        await server.stop()
+        await api.stop()
+
+    return summarize('webhook.postToHandler', {'updates': updates},
+                     [handled[chatId] - sentAt[chatId] for chatId in sentAt], total=total, rejected_status=rejectedStatus)
+
+
+def runWebhookBenchmarks(updates: int) -> List[BenchResult]:
+    """
+    Time updates from POST to the webhook listener until a handler runs
+
+    The fake Bot API plays Telegram: the bot registers its webhook there and
+    the updates are POSTed with the registered secret token. A request with a
+    wrong token must be rejected before that.
+
+    Args:
+        updates: Number of updates to deliver
+    """
+    return [asyncio.run(_runWebhook(updates))]
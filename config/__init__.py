@@ -1,3 +1,5 @@
-from .config import config
+from .config import config, LazyConfig
+from .targets import Target, getTargets
+from .configWatcher import ConfigWatcher, validateConfig
 
-__all__ = ['config']
\ No newline at end of file
+__all__ = ['config', 'LazyConfig', 'Target', 'getTargets', 'ConfigWatcher', 'validateConfig']
@@ -1,9 +1,63 @@
-import yaml
 import os
+import threading
+from collections.abc import MutableMapping
 
 # Get the directory where this config.py file is located
 config_dir = os.path.dirname(os.path.abspath(__file__))
 config_path = os.path.join(config_dir, 'config.yaml')
 
-with open(config_path, 'r') as configFile:
-    config = yaml.safe_load(configFile)
\ No newline at end of file
+
+class LazyConfig(MutableMapping):
+    """
+    Configuration mapping that reads config.yaml on first access instead of
+    at import time, so importing modules that use it stays cheap.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def read(self) -> dict:
+        """Parse the config file without applying it"""
+        # yaml is imported here, it is a noticeable part of import time
+        import yaml
+        with open(self.path, 'r') as configFile:
+            return yaml.safe_load(configFile) or {}
+
+    def load(self) -> dict:
+        """Read the config file now unless it was read already"""
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = self.read()
+        return self._data
+
+    def replace(self, data: dict) -> None:
+        """Swap in a new configuration at once, readers see either all old or all new values"""
+        self._data = data
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __setitem__(self, key, value) -> None:
+        self.load()[key] = value
+
+    def __delitem__(self, key) -> None:
+        del self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self) -> int:
+        return len(self.load())
+
+    def __repr__(self) -> str:
+        return f"LazyConfig({self.path!r}, loaded={self.loaded})"
+
+
+config = LazyConfig(config_path)
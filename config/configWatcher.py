@@ -0,0 +1,147 @@
+import asyncio
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils import styler
+from .config import LazyConfig
+from .targets import getTargets
+
+# Read once at startup, a changed value is only logged
+RESTART_REQUIRED_KEYS = (
+    'telegram-token', 'telegram-mode', 'telegram-api-base-url', 'webhook-url', 'webhook-path', 'webhook-listen',
+    'webhook-port', 'webhook-secret', 'broadcast-messages-per-second', 'chat-messages-per-second',
+    'broadcast-processes', 'storage-mode', 'sqlite-path', 'journal-compact-bytes', 'storage-io-workers',
+    'registration-batch-seconds', 'history-path', 'state-snapshot-path', 'outbox-enabled', 'outbox-path',
+    'outbox-max-attempts', 'outbox-retry-delay-seconds', 'outbox-max-retry-delay-seconds', 'metrics-port',
+    'metrics-listen', 'log-mode', 'log-level', 'log-format'
+)
+
+POSITIVE_NUMBER_KEYS = (
+    'timeinterval-to-check', 'max-concurrent-probes', 'probe-timeout', 'fast-interval-seconds', 'max-interval-seconds',
+    'confirm-interval-seconds', 'interval-backoff-factor', 'broadcast-concurrency', 'broadcast-messages-per-second',
+    'chat-messages-per-second', 'state-confirm-probes', 'state-confirm-window'
+)
+INTEGER_KEYS = ('max-concurrent-probes', 'state-confirm-probes', 'state-confirm-window', 'broadcast-concurrency',
+                'broadcast-max-retries', 'broadcast-processes')
+NON_NEGATIVE_NUMBER_KEYS = ('schedule-jitter-seconds', 'check-cache-seconds', 'state-min-duration-seconds', 'broadcast-max-retries',
+                            'broadcast-processes')
+CHOICES = {
+    'probe-backend': ('auto', 'icmp', 'tcp', 'subprocess'),
+    'missed-tick-policy': ('skip', 'coalesce'),
+    'storage-mode': ('csv', 'journal', 'sqlite'),
+    'telegram-mode': ('polling', 'webhook'),
+}
+
+
+def validateConfig(configData: Any) -> None:
+    """
+    Check a parsed config before it is applied
+
+    Raises:
+        ValueError: Describing the first problem found
+    """
+    if not isinstance(configData, dict):
+        raise ValueError("config must be a mapping")
+    if not configData.get('telegram-token'):
+        raise ValueError("telegram-token is required")
+
+    try:
+        targets = getTargets(configData)
+    except (KeyError, TypeError, AttributeError):
+        raise ValueError("targets entries need an ip-address, or ip-address must be set")
+    names = [target.name for target in targets]
+    if len(set(names)) != len(names):
+        raise ValueError("target names must be unique")
+
+    for key in POSITIVE_NUMBER_KEYS + NON_NEGATIVE_NUMBER_KEYS:
+        value = configData.get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{key} must be a number")
+        if key in INTEGER_KEYS and not isinstance(value, int):
+            raise ValueError(f"{key} must be an integer")
+        if value < 0 or (value == 0 and key in POSITIVE_NUMBER_KEYS):
+            raise ValueError(f"{key} must be {'positive' if key in POSITIVE_NUMBER_KEYS else 'zero or more'}")
+
+    if configData.get('state-confirm-probes', 2) > configData.get('state-confirm-window', 3):
+        raise ValueError("state-confirm-probes must not be larger than state-confirm-window")
+
+    if 'number-of-packets' in (configData.get('svitlo') or {}):
+        raise ValueError("svitlo.number-of-packets is no longer read, set number-of-packets at the top level")
+    packets = configData.get('number-of-packets', 4)
+    if isinstance(packets, bool) or not isinstance(packets, int) or packets < 1:
+        raise ValueError("number-of-packets must be a positive integer")
+
+    for key, choices in CHOICES.items():
+        if key in configData and configData[key] not in choices:
+            raise ValueError(f"{key} must be one of {', '.join(choices)}")
+
+
+class ConfigWatcher:
+    """
+    Polls the config file for changes and applies valid ones while the bot runs
+
+    A change is detected by modification time and size. The new file is
+    parsed and validated first; an invalid file is logged and the running
+    config stays in place. A valid one is swapped in at once and every
+    listener is called with the previous and the new config.
+    """
+
+    def __init__(self, config: LazyConfig, intervalSeconds: float = 5):
+        self.config = config
+        self.intervalSeconds = intervalSeconds
+        self._listeners: List[Callable[[Dict, Dict], None]] = []
+        self._signature = self._readSignature()
+
+    def addListener(self, listener: Callable[[Dict, Dict], None]) -> None:
+        self._listeners.append(listener)
+
+    def _readSignature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.config.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def checkNow(self) -> bool:
+        """
+        Apply the config file if it changed since the last check
+
+        Returns:
+            bool: True if a new config was applied
+        """
+        signature = await asyncio.to_thread(self._readSignature)
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+
+        try:
+            newConfig = await asyncio.to_thread(self.config.read)
+            validateConfig(newConfig)
+        except Exception as e:
+            styler.error(f"Config file changed but was not applied: {e}")
+            return False
+
+        oldConfig = dict(self.config)
+        changedKeys = sorted(key for key in set(oldConfig) | set(newConfig) if oldConfig.get(key) != newConfig.get(key))
+        if not changedKeys:
+            return False
+
+        self.config.replace(newConfig)
+        styler.success(f"Config reloaded, changed: {', '.join(changedKeys)}")
+        restartKeys = [key for key in changedKeys if key in RESTART_REQUIRED_KEYS]
+        if restartKeys:
+            styler.warning(f"Changes to {', '.join(restartKeys)} take effect after a restart")
+
+        for listener in self._listeners:
+            try:
+                listener(oldConfig, newConfig)
+            except Exception as e:
+                styler.error(f"Failed to apply reloaded config: {e}")
+        return True
+
+    async def run(self) -> None:
+        """Check for changes every `intervalSeconds` until cancelled"""
+        while True:
+            await asyncio.sleep(self.intervalSeconds)
+            await self.checkNow()
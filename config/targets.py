@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from typing import List, Dict, Any
+
+
+@dataclass(frozen=True)
+class Target:
+    """Location to monitor"""
+    name: str
+    address: str
+
+
+def getTargets(configData: Dict[str, Any]) -> List[Target]:
+    """
+    Build the list of targets from config
+
+    Uses the `targets` list when it is set, otherwise falls back to a single `ip-address`.
+
+    Args:
+        configData: Loaded config dict
+
+    Returns:
+        List[Target]: Targets to check
+    """
+    targetsConfig = configData.get('targets')
+    if not targetsConfig:
+        address = configData['ip-address']
+        return [Target(name=address, address=address)]
+
+    targets = []
+    for item in targetsConfig:
+        address = item['ip-address']
+        targets.append(Target(name=item.get('name', address), address=address))
+    return targets
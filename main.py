@@ -1,19 +1,69 @@
 #!/usr/bin/env python3
 from typing import Optional
 import asyncio
-from config import config
-from svitloService import svitloService
-from tgService import tgService
+import importlib
+# Imported first, startup times are measured from here
+from utils.startupTimer import startupTimer
+with startupTimer.measure('import config'):
+    from config import config, getTargets, ConfigWatcher, validateConfig
+with startupTimer.measure('import svitloService'):
+    from svitloService import svitloService
+from utils import styler
+from utils.metrics import metrics
+
+
+def _importTelegramService():
+    with startupTimer.measure('import tgService'):
+        return importlib.import_module('tgService').tgService
+
+
+async def _reportStartup() -> None:
+    await startupTimer.waitFor('first probe', 'bot ready')
+    startupTimer.report()
+
 
 async def main() -> None:
+    with startupTimer.measure('load config'):
+        config.load()
+    styler.configure(
+        mode=config.get('log-mode', 'sync'),
+        level=config.get('log-level', 'DEBUG'),
+        outputFormat=config.get('log-format', 'text')
+    )
+    # Reloads are checked by the watcher; a bad value must stop the start as well, not crash a probe later
+    try:
+        validateConfig(dict(config))
+    except ValueError as e:
+        styler.error(f"Invalid config: {e}")
+        raise SystemExit(1)
     intervalSeconds: Optional[int] = config.get('timeinterval-to-check', 30)
-    ipAddress: str = config['ip-address']
+    targets = getTargets(config)
+    maxConcurrentProbes: int = config.get('max-concurrent-probes', 10)
     tgToken = config['telegram-token']
-    
+
+    # Probing starts right away, the Telegram stack loads and connects meanwhile
+    status_task = asyncio.create_task(svitloService.runStatusChecksByTime(targets, intervalSeconds, maxConcurrentProbes))
+    report_task = asyncio.create_task(_reportStartup())
+    reloadSeconds = config.get('config-reload-interval-seconds', 5)
+    if reloadSeconds:
+        configWatcher = ConfigWatcher(config, reloadSeconds)
+        configWatcher.addListener(svitloService.applyConfig)
+        watcher_task = asyncio.create_task(configWatcher.run())
+    tgService = await asyncio.to_thread(_importTelegramService)
+    svitloService.setTelegramService(tgService)
+
+    metricsPort = config.get('metrics-port')
+    if metricsPort:
+        from storage import getAsyncStorageService
+        metrics.addCollector(getAsyncStorageService().collectMetrics)
+        await metrics.serve(config.get('metrics-listen', '127.0.0.1'), metricsPort)
+
     # Create tasks for both services to run concurrently
-    bot_task = asyncio.create_task(tgService.startPolling(tgToken))
-    status_task = asyncio.create_task(svitloService.runStatusChecksByTime(ipAddress, intervalSeconds))
-    
+    if config.get('telegram-mode', 'polling') == 'webhook':
+        bot_task = asyncio.create_task(tgService.startWebhook(tgToken))
+    else:
+        bot_task = asyncio.create_task(tgService.startPolling(tgToken))
+
     # Run both tasks concurrently
     try:
         await asyncio.gather(bot_task, status_task)
@@ -21,6 +71,7 @@ async def main() -> None:
         print("\nShutting down...")
         bot_task.cancel()
         status_task.cancel()
+        report_task.cancel()
 
 # Run the async main function
 if __name__ == "__main__":
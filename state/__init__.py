@@ -1,4 +1,25 @@
-from .stateService import stateService
+from .stateService import StateService, getStateService
+from .historyService import HistoryService, getHistoryService
 from .types import ElectricityState
 
-__all__ = ['stateService', 'ElectricityState']
\ No newline at end of file
+# Importing the submodules of the same names bound them here; unbind them so
+# the names resolve to the singletons through __getattr__
+del stateService, historyService
+
+__all__ = [
+    'stateService', 'historyService', 'StateService', 'HistoryService', 'getStateService', 'getHistoryService',
+    'ElectricityState', 'statsService', 'StatsService', 'getStatsService'
+]
+
+
+def __getattr__(name: str):
+    # The singletons are created on first access
+    if name == 'stateService':
+        return getStateService()
+    if name == 'historyService':
+        return getHistoryService()
+    # NumPy is only imported once statistics are needed, not before the first probe
+    if name in ('statsService', 'StatsService', 'getStatsService'):
+        from . import outageStats
+        return getattr(outageStats, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
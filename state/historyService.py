@@ -0,0 +1,290 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from config import config
+from utils import styler
+
+# timestamp (epoch seconds), target id, isOn, padding to 16 bytes
+RECORD = struct.Struct('<dIB3x')
+
+
+class _TimestampView:
+    """Sequence of record timestamps over a memory-mapped history file, for bisect"""
+
+    def __init__(self, buffer, count: int):
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> float:
+        return RECORD.unpack_from(self._buffer, index * RECORD.size)[0]
+
+
+class HistoryService:
+    """
+    Append-only log of electricity state transitions.
+
+    Transitions are stored as fixed-width binary records sorted by timestamp,
+    so range queries find their start with a binary search over the
+    memory-mapped file instead of scanning it. Target names are stored once
+    in a small JSON sidecar and referenced by id.
+    """
+
+    def __init__(self, history_file_path: str = None):
+        """
+        Initialize the history service
+        
+        Args:
+            history_file_path: Path to the history file. If None, uses default path.
+        """
+        if history_file_path is None:
+            current_dir = os.path.dirname(__file__)
+            history_file_path = os.path.join(current_dir, 'history.bin')
+        self.history_file_path = history_file_path
+        self.targets_file_path = f"{history_file_path}.targets.json"
+
+        self._lock = threading.Lock()
+        self._appendFile = None
+        self._lastTimestamp = 0.0
+        self._map: Optional[mmap.mmap] = None
+        self._mappedSize = 0
+        self._targetIds: Dict[str, int] = {}
+        self._targetNames: Dict[int, str] = {}
+        # Record indices of every target in file order, built once here and
+        # extended by record(), so queries never scan the file
+        self._positions: Dict[int, List[int]] = {}
+        self._recordCount = 0
+        self._loadTargets()
+        self._loadPositions()
+
+    def _loadTargets(self) -> None:
+        try:
+            with open(self.targets_file_path, 'r', encoding='utf-8') as file:
+                self._targetIds = json.load(file)
+        except FileNotFoundError:
+            self._targetIds = {}
+        self._targetNames = {targetId: name for name, targetId in self._targetIds.items()}
+
+    def _loadPositions(self) -> None:
+        try:
+            with open(self.history_file_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return
+        count = len(data) // RECORD.size
+        for index, (_, targetId, _) in enumerate(RECORD.iter_unpack(data[:count * RECORD.size])):
+            self._positions.setdefault(targetId, []).append(index)
+
+    def _getTargetId(self, target: str) -> int:
+        if target not in self._targetIds:
+            self._targetIds[target] = len(self._targetIds)
+            self._targetNames[self._targetIds[target]] = target
+            tmp_path = f"{self.targets_file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._targetIds, file)
+            os.replace(tmp_path, self.targets_file_path)
+        return self._targetIds[target]
+
+    def getTargets(self) -> List[str]:
+        return list(self._targetIds.keys())
+
+    def getTargetIds(self) -> Dict[str, int]:
+        """Target name -> id used in the records"""
+        return dict(self._targetIds)
+
+    def record(self, target: str, isOn: bool, timestamp: Optional[float] = None) -> None:
+        """
+        Append a state transition
+        
+        Args:
+            target: Target name
+            isOn: New state
+            timestamp: Epoch seconds, now if None. Kept non-decreasing so the
+                file stays sorted even if the wall clock steps back.
+        """
+        try:
+            with self._lock:
+                if self._appendFile is None:
+                    self._appendFile = open(self.history_file_path, 'ab')
+                    size = self._appendFile.tell()
+                    if size % RECORD.size:
+                        # A crash mid-append left a partial record, every later one would be misaligned
+                        styler.warning(f"Dropping a partial record at the end of {self.history_file_path}")
+                        size -= size % RECORD.size
+                        self._appendFile.truncate(size)
+                    self._recordCount = size // RECORD.size
+                    if self._recordCount:
+                        self._lastTimestamp = self._readLastTimestamp()
+
+                timestamp = max(timestamp if timestamp is not None else time.time(), self._lastTimestamp)
+                targetId = self._getTargetId(target)
+                self._appendFile.write(RECORD.pack(timestamp, targetId, int(isOn)))
+                self._appendFile.flush()
+                self._positions.setdefault(targetId, []).append(self._recordCount)
+                self._recordCount += 1
+                self._lastTimestamp = timestamp
+        except Exception as e:
+            styler.error(f"Error recording state history: {e}")
+
+    def _readLastTimestamp(self) -> float:
+        with open(self.history_file_path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            file.seek((size // RECORD.size - 1) * RECORD.size)
+            return RECORD.unpack(file.read(RECORD.size))[0]
+
+    def _getView(self) -> Tuple[Optional[mmap.mmap], int]:
+        """Map the history file, remapping it if it grew since the last call"""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.history_file_path)
+            except FileNotFoundError:
+                return None, 0
+
+            if size != self._mappedSize:
+                # The old map is not closed, readers in other threads may still
+                # hold it; it is released once the last of them drops it
+                self._map = None
+                if size:
+                    with open(self.history_file_path, 'rb') as file:
+                        self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mappedSize = size
+            return self._map, size // RECORD.size
+
+    def readRecords(self, startIndex: int = 0) -> Tuple[bytes, int]:
+        """
+        Returns:
+            tuple: (raw RECORD bytes from record `startIndex` on, total number of records)
+        """
+        buffer, count = self._getView()
+        if buffer is None or startIndex >= count:
+            return b'', count
+        return buffer[startIndex * RECORD.size:count * RECORD.size], count
+
+    def getTransitions(self, target: str, since: datetime, until: Optional[datetime] = None) -> List[Tuple[datetime, bool]]:
+        """
+        Get transitions of a target within a time range
+        
+        Args:
+            target: Target name
+            since: Range start
+            until: Range end, now if None
+            
+        Returns:
+            List[Tuple[datetime, bool]]: (time, isOn) pairs in time order
+        """
+        return [(datetime.fromtimestamp(ts), isOn) for ts, isOn in self._getRange(target, since.timestamp(), (until or datetime.now()).timestamp())[1]]
+
+    def _getRange(self, target: str, start: float, end: float) -> Tuple[Optional[bool], List[Tuple[float, bool]]]:
+        """
+        Returns:
+            tuple: (state of the target at `start` or None if unknown,
+                [(timestamp, isOn)] of its transitions within [start, end])
+        """
+        targetId = self._targetIds.get(target)
+        buffer, count = self._getView()
+        if targetId is None or not count:
+            return None, []
+
+        timestamps = _TimestampView(buffer, count)
+        first = bisect.bisect_left(timestamps, start)
+        last = bisect.bisect_right(timestamps, end, lo=first)
+
+        # May already hold records appended after the file was mapped, they lie past `last`
+        positions = self._positions.get(targetId, [])
+        firstPosition = bisect.bisect_left(positions, first)
+        lastPosition = bisect.bisect_left(positions, last, lo=firstPosition)
+
+        transitions = []
+        for index in positions[firstPosition:lastPosition]:
+            ts, _, isOn = RECORD.unpack_from(buffer, index * RECORD.size)
+            transitions.append((ts, bool(isOn)))
+
+        # The transition in force when the range starts is the target's last one before it
+        initialState = None
+        if firstPosition:
+            initialState = bool(RECORD.unpack_from(buffer, positions[firstPosition - 1] * RECORD.size)[2])
+
+        return initialState, transitions
+
+    def getOutages(self, target: str, since: datetime, until: Optional[datetime] = None) -> List[Tuple[datetime, datetime]]:
+        """
+        Get outage intervals of a target, clipped to the time range
+        
+        An outage still going on at `until` ends at `until`.
+        
+        Returns:
+            List[Tuple[datetime, datetime]]: (start, end) of every outage
+        """
+        start = since.timestamp()
+        end = (until or datetime.now()).timestamp()
+        initialState, transitions = self._getRange(target, start, end)
+
+        outages = []
+        outageStart = start if initialState is False else None
+        for ts, isOn in transitions:
+            if not isOn and outageStart is None:
+                outageStart = ts
+            elif isOn and outageStart is not None:
+                outages.append((outageStart, ts))
+                outageStart = None
+        if outageStart is not None:
+            outages.append((outageStart, end))
+
+        return [(datetime.fromtimestamp(a), datetime.fromtimestamp(b)) for a, b in outages]
+
+    def getOutageSummary(self, target: str, days: float = 7) -> Dict[str, object]:
+        """
+        Summarize outages of a target over the last `days` days
+        
+        Returns:
+            dict: outages count, total downtime and longest outage
+        """
+        now = datetime.now()
+        outages = self.getOutages(target, now - timedelta(days=days), now)
+        durations = [end - start for start, end in outages]
+
+        return {
+            'target': target,
+            'days': days,
+            'outages': len(outages),
+            'totalDowntime': sum(durations, timedelta()),
+            'longestOutage': max(durations, default=timedelta())
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._appendFile:
+                self._appendFile.close()
+                self._appendFile = None
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+                self._mappedSize = 0
+
+
+_historyLock = threading.Lock()
+_historyService: Optional[HistoryService] = None
+
+
+def getHistoryService() -> HistoryService:
+    """Return the singleton history, creating it from the config on first use"""
+    global _historyService
+    with _historyLock:
+        if _historyService is None:
+            _historyService = HistoryService(config.get('history-path'))
+        return _historyService
+
+
+def __getattr__(name: str):
+    # The singleton is created on first access
+    if name == 'historyService':
+        return getHistoryService()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,283 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import config
+from utils import styler
+from .historyService import HistoryService, getHistoryService, RECORD
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Same layout as historyService.RECORD, so the history file maps straight onto an array
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('target', '<u4'), ('isOn', 'u1'), ('padding', 'V3')])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+
+def _localOffsets(timestamps: np.ndarray) -> np.ndarray:
+    """UTC offset in seconds of every timestamp, looked up once per day"""
+    days, inverse = np.unique(timestamps // DAY, return_inverse=True)
+    offsets = np.array([time.localtime(day * DAY + DAY / 2).tm_gmtoff for day in days], dtype=float)
+    return offsets[inverse.reshape(-1)]
+
+
+def _splitByHour(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cut outages into pieces at local hour boundaries
+
+    Returns:
+        tuple: (local hour since the epoch of every piece, piece durations in seconds)
+    """
+    offsets = _localOffsets(starts)
+    localStarts = starts + offsets
+    localEnds = ends + offsets
+    firstHours = (localStarts // HOUR).astype(np.int64)
+    counts = (localEnds // HOUR).astype(np.int64) - firstHours + 1
+
+    outageIndex = np.repeat(np.arange(len(starts)), counts)
+    hours = firstHours[outageIndex] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    pieceStarts = np.maximum(localStarts[outageIndex], hours * HOUR)
+    pieceEnds = np.minimum(localEnds[outageIndex], (hours + 1) * HOUR)
+    return hours, pieceEnds - pieceStarts
+
+
+class _TargetRollup:
+    """Daily aggregates of one target. Row 0 is local day `firstDay` counted from the epoch."""
+
+    def __init__(self):
+        self.firstDay = 0
+        self.downtime = np.zeros((0, 24))  # seconds without power per local hour
+        self.outages = np.zeros(0, dtype=np.int64)  # outages by start day
+        self.outageSeconds = np.zeros(0)  # full length of those outages
+        self.longest = np.zeros(0)
+        self.observedFrom: Optional[float] = None
+        self.lastState: Optional[bool] = None
+        self.openSince: Optional[float] = None
+
+    def _ensureDays(self, firstDay: int, lastDay: int) -> None:
+        if not len(self.outages):
+            self.firstDay = firstDay
+        before = max(0, self.firstDay - firstDay)
+        after = max(0, lastDay - (self.firstDay + len(self.outages) - 1))
+        if before or after:
+            self.downtime = np.pad(self.downtime, ((before, after), (0, 0)))
+            self.outages = np.pad(self.outages, (before, after))
+            self.outageSeconds = np.pad(self.outageSeconds, (before, after))
+            self.longest = np.pad(self.longest, (before, after))
+            self.firstDay -= before
+
+    def addOutages(self, starts: np.ndarray, ends: np.ndarray) -> None:
+        hours, durations = _splitByHour(starts, ends)
+        days = hours // 24
+        startDays = ((starts + _localOffsets(starts)) // DAY).astype(np.int64)
+        self._ensureDays(int(min(days.min(), startDays.min())), int(max(days.max(), startDays.max())))
+
+        np.add.at(self.downtime, (days - self.firstDay, hours % 24), durations)
+        np.add.at(self.outages, startDays - self.firstDay, 1)
+        np.add.at(self.outageSeconds, startDays - self.firstDay, ends - starts)
+        np.maximum.at(self.longest, startDays - self.firstDay, ends - starts)
+
+    def applyTransitions(self, timestamps: np.ndarray, isOn: np.ndarray) -> None:
+        """Fold new transitions of this target in, in time order"""
+        if self.observedFrom is None:
+            self.observedFrom = float(timestamps[0])
+
+        # Drop records that repeat the state before them, so ON and OFF alternate
+        keepFirst = self.lastState is None or bool(isOn[0]) != self.lastState
+        keep = np.concatenate(([keepFirst], isOn[1:] != isOn[:-1]))
+        timestamps, isOn = timestamps[keep], isOn[keep]
+        if not len(timestamps):
+            return
+
+        starts = timestamps[~isOn]
+        ends = timestamps[isOn]
+        if self.openSince is not None:
+            starts = np.concatenate(([self.openSince], starts))
+        if len(ends) and (not len(starts) or ends[0] < starts[0]):
+            # Power came on from an unknown state, no outage ends there
+            ends = ends[1:]
+
+        closed = len(ends)
+        if closed:
+            self.addOutages(starts[:closed], ends)
+        self.openSince = float(starts[closed]) if len(starts) > closed else None
+        self.lastState = bool(isOn[-1])
+
+    def toMeta(self) -> dict:
+        return {'firstDay': self.firstDay, 'observedFrom': self.observedFrom, 'lastState': self.lastState, 'openSince': self.openSince}
+
+    def toArrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}.downtime": self.downtime, f"{prefix}.outages": self.outages,
+                f"{prefix}.outageSeconds": self.outageSeconds, f"{prefix}.longest": self.longest}
+
+    @classmethod
+    def load(cls, meta: dict, arrays, prefix: str) -> '_TargetRollup':
+        rollup = cls()
+        rollup.firstDay = meta['firstDay']
+        rollup.observedFrom = meta['observedFrom']
+        rollup.lastState = meta['lastState']
+        rollup.openSince = meta['openSince']
+        rollup.downtime = arrays[f"{prefix}.downtime"]
+        rollup.outages = arrays[f"{prefix}.outages"]
+        rollup.outageSeconds = arrays[f"{prefix}.outageSeconds"]
+        rollup.longest = arrays[f"{prefix}.longest"]
+        return rollup
+
+
+class StatsService:
+    """
+    Uptime and outage statistics from precomputed daily rollups.
+
+    Rollups hold, per target and local day, the downtime of every hour, the
+    number of outages that started that day, their total and their longest
+    length. They are brought up to date from the records appended to the
+    history since the last update, so a query never rescans the history; the
+    whole history is only read when the rollup file is missing. Interval math
+    runs vectorized over all new records at once.
+    """
+
+    def __init__(self, history: HistoryService, rollup_file_path: str = None):
+        """
+        Initialize the statistics
+
+        Args:
+            history: History the rollups are computed from
+            rollup_file_path: Path to the rollup file. If None, uses default path.
+        """
+        if rollup_file_path is None:
+            current_dir = os.path.dirname(__file__)
+            rollup_file_path = os.path.join(current_dir, 'stats_rollup.npz')
+        self.rollup_file_path = rollup_file_path
+        self.history = history
+
+        self._lock = threading.Lock()
+        self._rollups: Dict[str, _TargetRollup] = {}
+        self._processed = 0
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with np.load(self.rollup_file_path, allow_pickle=False) as arrays:
+                meta = json.loads(str(arrays['meta']))
+                self._processed = meta['processed']
+                self._rollups = {
+                    name: _TargetRollup.load(targetMeta, arrays, str(index))
+                    for index, (name, targetMeta) in enumerate(meta['targets'].items())
+                }
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            styler.error(f"Error loading outage statistics, rebuilding them from history: {e}")
+            self._rollups, self._processed = {}, 0
+
+    def _save(self) -> None:
+        meta = {'processed': self._processed, 'targets': {name: rollup.toMeta() for name, rollup in self._rollups.items()}}
+        arrays = {'meta': np.array(json.dumps(meta))}
+        for index, rollup in enumerate(self._rollups.values()):
+            arrays.update(rollup.toArrays(str(index)))
+
+        tmp_path = f"{self.rollup_file_path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(tmp_path, self.rollup_file_path)
+        except Exception as e:
+            styler.error(f"Error saving outage statistics: {e}")
+
+    def update(self) -> None:
+        """Fold history records appended since the last update into the rollups"""
+        with self._lock:
+            raw, count = self.history.readRecords(self._processed)
+            if count < self._processed:
+                # The history was replaced, start over
+                self._rollups, self._processed = {}, 0
+                raw, count = self.history.readRecords(0)
+            if not raw:
+                return
+
+            records = np.frombuffer(raw, dtype=RECORD_DTYPE)
+            names = {targetId: name for name, targetId in self.history.getTargetIds().items()}
+            for targetId in np.unique(records['target']):
+                rows = records[records['target'] == targetId]
+                rollup = self._rollups.setdefault(names[int(targetId)], _TargetRollup())
+                rollup.applyTransitions(rows['timestamp'], rows['isOn'].astype(bool))
+            self._processed = count
+            self._save()
+
+    def getTargets(self) -> List[str]:
+        return list(self._rollups.keys())
+
+    def getStats(self, target: str, days: int = 7) -> Optional[Dict[str, object]]:
+        """
+        Statistics of a target over the last `days` local days, today included
+
+        Outages are counted on the day they started; an outage still going on
+        counts up to now.
+
+        Returns:
+            dict: uptimePercent (None without observations), outages, downtime,
+                meanOutage (of finished outages) and longestOutage, and heatmap - the share of time in
+                percent without power for every hour of the day. None for an
+                unknown target.
+        """
+        with self._lock:
+            rollup = self._rollups.get(target)
+            if rollup is None:
+                return None
+
+            now = time.time()
+            windowStart = datetime.combine(datetime.now().date() - timedelta(days=days - 1), datetime.min.time()).timestamp()
+            dayFrom = int((windowStart + _localOffsets(np.array([windowStart]))[0]) // DAY)
+            first = max(0, dayFrom - rollup.firstDay)
+            downtime = rollup.downtime[first:].sum(axis=0)
+            outages = int(rollup.outages[first:].sum())
+            completedSeconds = float(rollup.outageSeconds[first:].sum())
+            longest = float(rollup.longest[first:].max(initial=0))
+            completed = outages
+
+            if rollup.openSince is not None:
+                # The ongoing outage is not in the rollups yet
+                hours, durations = _splitByHour(np.array([rollup.openSince]), np.array([now]))
+                inWindow = hours // 24 >= dayFrom
+                np.add.at(downtime, hours[inWindow] % 24, durations[inWindow])
+                if rollup.openSince >= windowStart:
+                    outages += 1
+                longest = max(longest, now - rollup.openSince)
+
+            observed = now - max(windowStart, rollup.observedFrom)
+            totalDowntime = float(downtime.sum())
+            return {
+                'target': target,
+                'days': days,
+                'uptimePercent': 100 * (1 - totalDowntime / observed) if observed > 0 else None,
+                'outages': outages,
+                'downtime': timedelta(seconds=totalDowntime),
+                'meanOutage': timedelta(seconds=completedSeconds / completed) if completed else timedelta(),
+                'longestOutage': timedelta(seconds=longest),
+                'heatmap': (100 * downtime / (observed / 24)).round(1).tolist() if observed > 0 else [0.0] * 24
+            }
+
+
+_statsLock = threading.Lock()
+_statsService: Optional[StatsService] = None
+
+
+def getStatsService() -> StatsService:
+    """Return the singleton statistics, creating them from the config on first use"""
+    global _statsService
+    with _statsLock:
+        if _statsService is None:
+            _statsService = StatsService(getHistoryService(), config.get('stats-path'))
+            # Catch up with transitions recorded while the rollups were not loaded
+            _statsService.update()
+        return _statsService
+
+
+def __getattr__(name: str):
+    # The singleton is created on first access
+    if name == 'statsService':
+        return getStatsService()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,40 +1,202 @@
+import json
+import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Deque
+from config import config
 from utils import styler
-from .types import ElectricityState
+from .types import ElectricityState, TransitionPolicy
+from .historyService import getHistoryService
 
 class StateService:
-    def __init__(self):
-        self._electricityState: ElectricityState = ElectricityState(isOn = None, lastUpdateTime = None)
+    def __init__(self, snapshot_file_path: str = None):
+        if snapshot_file_path is None:
+            current_dir = os.path.dirname(__file__)
+            snapshot_file_path = os.path.join(current_dir, 'state_snapshot.json')
+        self.snapshot_file_path = snapshot_file_path
+        self._electricityStates: Dict[str, ElectricityState] = self._loadSnapshot()
+        self._transitionPolicy = TransitionPolicy.fromConfig(config)
+        # Recent probe results and when an unconfirmed change was first seen, per target
+        self._probeWindows: Dict[str, Deque[bool]] = {}
+        self._pendingSince: Dict[str, float] = {}
+        # When each target was last probed, whatever the result
+        self._lastCheckTimes: Dict[str, datetime] = {}
+        self._lastCheckAt: Dict[str, float] = {}
+        # Serializes saveTransition calls from worker threads
+        self._saveLock = threading.Lock()
 
 
-    def getElectricityState(self) -> ElectricityState:
-        return self._electricityState
+    def getElectricityState(self, target: str) -> ElectricityState:
+        if target not in self._electricityStates:
+            self._electricityStates[target] = ElectricityState(isOn = None, lastUpdateTime = None)
+        return self._electricityStates[target]
 
  
-    def setElectricityState(self, isOn: bool) -> None:
-        self._electricityState.isOn = isOn
-        self._electricityState.lastUpdateTime = datetime.now()
+    def setElectricityState(self, target: str, isOn: bool) -> None:
+        """Set the state in memory, saveTransition writes it to disk"""
+        state = self.getElectricityState(target)
+        state.isOn = isOn
+        state.lastUpdateTime = datetime.now()
 
 
-    def getStatusIcon(self) -> str:
-        if self._electricityState.isOn is None:
+    def saveTransition(self, target: str, isOn: bool, timestamp: float) -> None:
+        """
+        Append a transition to the history and rewrite the snapshot
+
+        Blocks on file I/O, callers on the event loop run it in a thread.
+        """
+        with self._saveLock:
+            getHistoryService().record(target, isOn, timestamp)
+            self._saveSnapshot()
+
+
+    def _loadSnapshot(self) -> Dict[str, ElectricityState]:
+        """Load the last known states, so a restart does not announce them again"""
+        try:
+            with open(self.snapshot_file_path, 'r', encoding='utf-8') as file:
+                snapshot = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            styler.error(f"Error loading state snapshot: {e}")
+            return {}
+
+        states = {}
+        for target, data in snapshot.items():
+            lastUpdateTime = data.get('lastUpdateTime')
+            states[target] = ElectricityState(
+                isOn=data.get('isOn'),
+                lastUpdateTime=datetime.fromisoformat(lastUpdateTime) if lastUpdateTime else None
+            )
+        if states:
+            styler.info(f"Restored state of {len(states)} targets from {self.snapshot_file_path}")
+        return states
+
+
+    def _saveSnapshot(self) -> None:
+        """Write the states of all targets atomically (temp file + rename)"""
+        snapshot = {
+            target: {
+                'isOn': state.isOn,
+                'lastUpdateTime': state.lastUpdateTime.isoformat() if state.lastUpdateTime else None
+            }
+            for target, state in list(self._electricityStates.items())
+            if state.isOn is not None
+        }
+        try:
+            tmp_path = f"{self.snapshot_file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(snapshot, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.snapshot_file_path)
+        except Exception as e:
+            styler.error(f"Error saving state snapshot: {e}")
+
+
+    def setTransitionPolicy(self, policy: TransitionPolicy) -> None:
+        if policy == self._transitionPolicy:
+            return
+        self._transitionPolicy = policy
+        self._probeWindows.clear()
+        self._pendingSince.clear()
+
+
+    def recordProbe(self, target: str, isOn: bool) -> Optional[bool]:
+        """
+        Feed a probe result into the state machine of a target
+        
+        A change from a known state is only confirmed once it satisfies the
+        transition policy and the newest probe agrees with it, so a flapping
+        link does not flip the state back and forth. The first result for a
+        target with unknown state is taken as is.
+        
+        Returns:
+            Optional[bool]: The new state if a change got confirmed, None otherwise
+        """
+        self._lastCheckTimes[target] = datetime.now()
+        self._lastCheckAt[target] = time.monotonic()
+        policy = self._transitionPolicy
+        currentState = self.getElectricityState(target).isOn
+        if currentState is None:
+            return isOn
+
+        window = self._probeWindows.get(target)
+        if window is None or window.maxlen != policy.windowProbes:
+            window = self._probeWindows[target] = deque(window or (), maxlen=policy.windowProbes)
+        window.append(isOn)
+
+        disagreeing = sum(1 for result in window if result != currentState)
+        if not disagreeing:
+            self._pendingSince.pop(target, None)
+            return None
+
+        now = time.monotonic()
+        pendingSince = self._pendingSince.setdefault(target, now)
+        if (isOn != currentState and disagreeing >= policy.confirmProbes
+                and now - pendingSince >= policy.minDurationSeconds):
+            window.clear()
+            self._pendingSince.pop(target, None)
+            return not currentState
+
+        return None
+
+
+    def isChangePending(self, target: str) -> bool:
+        """True if the target has seen a state change that is not confirmed yet"""
+        return target in self._pendingSince
+
+
+    def getCheckAge(self, target: str) -> Optional[float]:
+        """Seconds since the target was last probed, None if not since startup"""
+        checkedAt = self._lastCheckAt.get(target)
+        return time.monotonic() - checkedAt if checkedAt is not None else None
+
+
+    def getTargets(self) -> list:
+        return list(self._electricityStates.keys())
+
+
+    def getStatusIcon(self, target: str) -> str:
+        state = self.getElectricityState(target)
+        if state.isOn is None:
             return "❓"  # Unknown state
-        return "💡" if self._electricityState.isOn else "🌚"
+        return "💡" if state.isOn else "🌚"
     
-    def getStatus(self) -> dict:
-        state = self.getElectricityState()
+    def getStatus(self, target: str) -> dict:
+        state = self.getElectricityState(target)
         return {
+            "target": target,
             "isOn": state.isOn,
             "lastUpdateTime": state.lastUpdateTime,
-            "icon": self.getStatusIcon(),
+            "lastCheckTime": self._lastCheckTimes.get(target),
+            "icon": self.getStatusIcon(target),
             "text": "ON" if state.isOn else "OFF" if state.isOn is not None else "UNKNOWN"
         }
     
     
-    def isElectricityOn(self) -> Optional[bool]:
-        return self._electricityState.isOn
+    def isElectricityOn(self, target: str) -> Optional[bool]:
+        return self.getElectricityState(target).isOn
+
+
+
+_stateLock = threading.Lock()
+_stateService: Optional[StateService] = None
+
 
+def getStateService() -> StateService:
+    """Return the singleton state, creating it from the config on first use"""
+    global _stateService
+    with _stateLock:
+        if _stateService is None:
+            _stateService = StateService(config.get('state-snapshot-path'))
+        return _stateService
 
 
-stateService = StateService()
\ No newline at end of file
+def __getattr__(name: str):
+    # The singleton is created on first access
+    if name == 'stateService':
+        return getStateService()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
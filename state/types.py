@@ -1,7 +1,28 @@
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 
 @dataclass
 class ElectricityState:
-    isOn: bool
-    lastUpdateTime: datetime
\ No newline at end of file
+    isOn: Optional[bool]
+    lastUpdateTime: Optional[datetime]
+
+
+@dataclass
+class TransitionPolicy:
+    """
+    When a state change counts as confirmed: at least `confirmProbes` of the
+    last `windowProbes` probes disagree with the current state, and the first
+    of them was at least `minDurationSeconds` ago
+    """
+    confirmProbes: int = 2
+    windowProbes: int = 3
+    minDurationSeconds: float = 0
+
+    @classmethod
+    def fromConfig(cls, configData) -> 'TransitionPolicy':
+        return cls(
+            confirmProbes=configData.get('state-confirm-probes', 2),
+            windowProbes=configData.get('state-confirm-window', 3),
+            minDurationSeconds=configData.get('state-min-duration-seconds', 0)
+        )
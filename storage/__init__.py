@@ -1,3 +1,23 @@
-from .storageService import storageService, ChatInfo, StorageService
+from .storageService import ChatInfo, StorageService
+from .journalStorageService import JournalStorageService
+from .sqliteStorageService import SqliteStorageService
+from .asyncStorageService import AsyncStorageService
+from .subscriptionService import SubscriptionService, ALL_LOCATIONS
+from .storageFactory import createStorageService, getStorageService, getAsyncStorageService, getSubscriptionService
 
-__all__ = ['storageService', 'ChatInfo', 'StorageService']
\ No newline at end of file
+# Importing the submodules of the same names bound them here; unbind them so
+# the names resolve to the singletons through __getattr__
+del storageService, asyncStorageService, subscriptionService
+
+__all__ = [
+    'storageService', 'asyncStorageService', 'ChatInfo', 'StorageService', 'JournalStorageService',
+    'SqliteStorageService', 'AsyncStorageService', 'createStorageService', 'getStorageService', 'getAsyncStorageService',
+    'subscriptionService', 'SubscriptionService', 'ALL_LOCATIONS', 'getSubscriptionService'
+]
+
+
+def __getattr__(name: str):
+    # The singletons are created on first access
+    if name in ('storageService', 'asyncStorageService', 'subscriptionService'):
+        return getattr(storageFactory, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
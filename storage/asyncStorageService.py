@@ -0,0 +1,115 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from utils.metrics import storageOperationDuration, subscribers
+from .storageService import ChatInfo
+
+
+class AsyncStorageService:
+    """
+    Async facade over a storage service for use inside coroutines.
+
+    Every call runs on a small bounded thread pool so disk I/O never stalls
+    the event loop. Chat registrations that arrive within `batch_window_seconds`
+    of each other are saved together with one `saveChats` write.
+    """
+
+    def __init__(self, storage, max_workers: int = 2, batch_window_seconds: float = 0.05):
+        """
+        Initialize the async storage facade
+        
+        Args:
+            storage: Storage service to wrap, or a function creating it. A function
+                is called on the first storage call, in an I/O thread
+            max_workers: Threads doing storage I/O
+            batch_window_seconds: How long to collect registrations before writing them
+        """
+        self._storage = storage if not callable(storage) else None
+        self._storageFactory = storage if callable(storage) else None
+        self.batch_window_seconds = batch_window_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='storage-io')
+        self._pendingChats: List[Tuple[ChatInfo, asyncio.Future]] = []
+        self._flushTask: Optional[asyncio.Task] = None
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = self._storageFactory()
+        return self._storage
+
+    def _call(self, operation: str, *args) -> Any:
+        return getattr(self.storage, operation)(*args)
+
+    async def _run(self, operation: str, *args) -> Any:
+        """Run a storage method by name on the I/O threads"""
+        loop = asyncio.get_running_loop()
+        startTime = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(self._call, operation, *args))
+        finally:
+            storageOperationDuration.observe(time.perf_counter() - startTime, operation=operation)
+
+    async def saveChat(self, chat_id: int, username: str = "", first_name: str = "", last_name: str = "") -> bool:
+        """
+        Save a new chat, batched with other registrations arriving at the same time
+        
+        Returns:
+            bool: True if the chat was saved, False if it already existed or saving failed
+        """
+        future = asyncio.get_running_loop().create_future()
+        chat_info = ChatInfo(chat_id=chat_id, username=username or "", first_name=first_name or "", last_name=last_name or "")
+        self._pendingChats.append((chat_info, future))
+
+        if self._flushTask is None:
+            self._flushTask = asyncio.create_task(self._flushPendingChats())
+        return await future
+
+    async def _flushPendingChats(self) -> None:
+        await asyncio.sleep(self.batch_window_seconds)
+        batch, self._pendingChats = self._pendingChats, []
+        self._flushTask = None
+
+        try:
+            results = await self._run('saveChats', [chat_info for chat_info, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def collectMetrics(self) -> None:
+        """Refresh the subscriber gauges, registered as a metrics collector"""
+        statistics = await self.get_statistics()
+        subscribers.set(statistics['active_chats'], state='active')
+        subscribers.set(statistics['inactive_chats'], state='inactive')
+
+    async def getAllChatIds(self) -> List[int]:
+        return await self._run('getAllChatIds')
+
+    async def filterActiveChatIds(self, chat_ids: List[int]) -> List[int]:
+        return await self._run('filterActiveChatIds', chat_ids)
+
+    async def get_chat_info(self, chat_id: int) -> Optional[ChatInfo]:
+        return await self._run('get_chat_info', chat_id)
+
+    async def get_statistics(self) -> Dict[str, Any]:
+        return await self._run('get_statistics')
+
+    async def deactivate_chat_id(self, chat_id: int) -> bool:
+        return await self._run('deactivate_chat_id', chat_id)
+
+    async def deactivate_chat_ids(self, chat_ids: List[int]) -> int:
+        return await self._run('deactivate_chat_ids', chat_ids)
+
+    async def activate_chat_id(self, chat_id: int) -> bool:
+        return await self._run('activate_chat_id', chat_id)
+
+    async def delete_chat_id(self, chat_id: int) -> bool:
+        return await self._run('delete_chat_id', chat_id)
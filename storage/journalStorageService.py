@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+from dataclasses import replace
+from typing import List, Optional, Dict, Any, Tuple
+from utils import styler
+from .storageService import StorageService, ChatInfo
+
+# Journal operations
+OP_ADD = 'add'
+OP_ACTIVATE = 'activate'
+OP_DEACTIVATE = 'deactivate'
+OP_DELETE = 'delete'
+
+
+class JournalStorageService(StorageService):
+    """
+    Chat storage that appends every change to a journal instead of rewriting
+    the CSV file.
+
+    The CSV file is a snapshot; the state is the snapshot with the journal
+    replayed on top of it. Once the journal grows past `compact_threshold_bytes`
+    a background thread writes a fresh snapshot (atomically, via rename) and
+    drops the journal entries it already contains. Every journal operation
+    sets the full state of one chat, so replaying an entry twice is harmless.
+    """
+
+    def __init__(self, csv_file_path: str = None, compact_threshold_bytes: int = 1024 * 1024):
+        """
+        Initialize the journal storage service
+        
+        Args:
+            csv_file_path: Path to the snapshot CSV file. If None, uses default path.
+            compact_threshold_bytes: Journal size that triggers compaction
+        """
+        super().__init__(csv_file_path)
+        self.journal_file_path = f"{self.csv_file_path}.journal"
+        self.compact_threshold_bytes = compact_threshold_bytes
+        self._journalFile = None
+        self._compactionThread: Optional[threading.Thread] = None
+        # Bumped whenever the snapshot is replaced outside of compaction
+        self._snapshotGeneration = 0
+
+    def _getFileSignature(self) -> Optional[Tuple[int, int]]:
+        signature = super()._getFileSignature()
+        try:
+            stat = os.stat(self.journal_file_path)
+        except FileNotFoundError:
+            return signature
+        return (signature, stat.st_mtime_ns, stat.st_size)
+
+    def _read_chat_info_file(self) -> List[ChatInfo]:
+        """Read the snapshot and replay the journal on top of it"""
+        index = {info.chat_id: info for info in super()._read_chat_info_file()}
+
+        try:
+            with open(self.journal_file_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash mid-append
+                        styler.warning(f"Skipping corrupted journal entry in {self.journal_file_path}")
+                        continue
+                    self._apply_entry(index, entry)
+        except FileNotFoundError:
+            pass
+
+        return list(index.values())
+
+    @staticmethod
+    def _apply_entry(index: Dict[int, ChatInfo], entry: Dict[str, Any]) -> None:
+        op = entry['op']
+        if op == OP_ADD:
+            info = ChatInfo.from_dict(entry['chat'])
+            index[info.chat_id] = info
+            return
+
+        chat_id = entry['chat_id']
+        if op == OP_DELETE:
+            index.pop(chat_id, None)
+        elif chat_id in index:
+            index[chat_id].is_active = op == OP_ACTIVATE
+
+    def _append_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """Append entries to the journal and compact it if it got too big"""
+        if self._journalFile is None:
+            self._journalFile = open(self.journal_file_path, 'a', encoding='utf-8')
+            if not self._endsWithNewline():
+                # Terminate a torn last line, the first new entry would be glued onto it
+                self._journalFile.write('\n')
+
+        self._journalFile.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        self._journalFile.flush()
+        self._markWritten()
+
+        if self._journalFile.tell() >= self.compact_threshold_bytes:
+            self.compactInBackground()
+
+    def _endsWithNewline(self) -> bool:
+        with open(self.journal_file_path, 'rb') as file:
+            size = file.seek(0, os.SEEK_END)
+            if not size:
+                return True
+            file.seek(size - 1)
+            return file.read(1) == b'\n'
+
+    def _persist_new_chats(self, chat_infos: List[ChatInfo]) -> None:
+        self._append_entries([{'op': OP_ADD, 'chat': info.to_dict()} for info in chat_infos])
+
+    def _persist_chats_active(self, chat_ids: List[int], is_active: bool) -> None:
+        op = OP_ACTIVATE if is_active else OP_DEACTIVATE
+        self._append_entries([{'op': op, 'chat_id': chat_id} for chat_id in chat_ids])
+
+    def _persist_delete(self, chat_id: int) -> None:
+        self._append_entries([{'op': OP_DELETE, 'chat_id': chat_id}])
+
+    def _write_all_chat_info(self, chat_infos: List[ChatInfo]) -> bool:
+        """Replace the snapshot with `chat_infos` and start an empty journal"""
+        try:
+            with self._lock:
+                self._write_csv_file(self.csv_file_path, chat_infos)
+                self._truncate_journal(0)
+                self._snapshotGeneration += 1
+                self._setIndex({info.chat_id: info for info in chat_infos})
+                self._markWritten()
+            return True
+        except Exception as e:
+            styler.error(f"Error writing chat info: {e}")
+            return False
+
+    def _truncate_journal(self, offset: int) -> None:
+        """Drop the first `offset` bytes of the journal, atomically"""
+        if self._journalFile is not None:
+            self._journalFile.close()
+            self._journalFile = None
+
+        try:
+            with open(self.journal_file_path, 'r', encoding='utf-8') as file:
+                file.seek(offset)
+                tail = file.read()
+        except FileNotFoundError:
+            tail = ''
+
+        tmp_path = f"{self.journal_file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(tail)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.journal_file_path)
+
+    def compact(self) -> bool:
+        """
+        Fold the journal into a new snapshot
+        
+        The snapshot is written outside the lock, so writers are only blocked
+        while the registry is copied and while the journal is cut.
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            with self._lock:
+                if self._journalFile is not None:
+                    self._journalFile.flush()
+                # Read errors abort compaction, an empty snapshot would replace every chat
+                chat_infos = [replace(info) for info in self._getIndex().values()]
+                generation = self._snapshotGeneration
+                offset = os.path.getsize(self.journal_file_path) if os.path.exists(self.journal_file_path) else 0
+
+            self._write_csv_file(f"{self.csv_file_path}.compact", chat_infos)
+
+            with self._lock:
+                if generation != self._snapshotGeneration:
+                    # The snapshot was rewritten meanwhile, ours is stale
+                    os.remove(f"{self.csv_file_path}.compact")
+                    return False
+                os.replace(f"{self.csv_file_path}.compact", self.csv_file_path)
+                # A crash here leaves already applied entries in the journal,
+                # replaying them over the new snapshot changes nothing
+                self._truncate_journal(offset)
+                self._markWritten()
+
+            styler.info(f"Chat journal compacted ({len(chat_infos)} chats)")
+            return True
+        except Exception as e:
+            styler.error(f"Error compacting chat journal: {e}")
+            return False
+
+    def compactInBackground(self) -> None:
+        """Start compaction in a background thread unless one is already running"""
+        if self._compactionThread and self._compactionThread.is_alive():
+            return
+        self._compactionThread = threading.Thread(target=self.compact, name='chat-journal-compaction', daemon=True)
+        self._compactionThread.start()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        statistics = super().get_statistics()
+        statistics['journal_file_path'] = self.journal_file_path
+        return statistics
@@ -0,0 +1,372 @@
+import os
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from utils import styler
+from .storageService import ChatInfo, StorageService
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    chat_id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL DEFAULT '',
+    first_name TEXT NOT NULL DEFAULT '',
+    last_name TEXT NOT NULL DEFAULT '',
+    date_added TEXT NOT NULL DEFAULT '',
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_chats_is_active ON chats (is_active, chat_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SqliteStorageService(StorageService):
+    """
+    Chat storage backed by SQLite.
+
+    Overrides every public method of StorageService with queries, the CSV
+    registry of the base class is not used. One connection is owned by a
+    dedicated worker thread and every query runs there; coroutines go through
+    AsyncStorageService like with the other backends.
+    """
+
+    def __init__(self, db_file_path: str = None, csv_file_path: str = None):
+        """
+        Initialize the SQLite storage service
+        
+        Args:
+            db_file_path: Path to the database file. If None, uses default path.
+            csv_file_path: CSV file to import once on first start. If None, uses the
+                default chat_ids.csv path.
+        """
+        # The base initializer would create the CSV file, only the import reads it
+        current_dir = os.path.dirname(__file__)
+        self.db_file_path = db_file_path or os.path.join(current_dir, 'chat_ids.sqlite3')
+        self.csv_file_path = csv_file_path or os.path.join(current_dir, 'chat_ids.csv')
+
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-storage')
+        self._connection: Optional[sqlite3.Connection] = None
+        self._call(self._open)
+        self._call(self._migrate_from_csv)
+
+    def _open(self) -> None:
+        self._connection = sqlite3.connect(self.db_file_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+        self._connection.commit()
+
+    def _submit(self, func: Callable, *args) -> Future:
+        return self._worker.submit(func, *args)
+
+    def _call(self, func: Callable, *args) -> Any:
+        """Run `func` on the worker thread and wait for it"""
+        return self._submit(func, *args).result()
+
+    def close(self) -> None:
+        def closeConnection():
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+
+        self._call(closeConnection)
+        self._worker.shutdown(wait=True)
+
+    def _migrate_from_csv(self) -> None:
+        """Import chats from the CSV file once, on the first start with SQLite"""
+        conn = self._connection
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_migrated'").fetchone():
+            return
+
+        imported = 0
+        if os.path.exists(self.csv_file_path):
+            # Malformed rows are skipped with a warning rather than failing the start
+            rows = [self._to_row(info) for info in self._read_chat_info_file()]
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO chats VALUES (?, ?, ?, ?, ?, ?)', rows)
+            imported = len(rows)
+
+        with conn:
+            conn.execute("INSERT INTO meta (key, value) VALUES ('csv_migrated', ?)", (datetime.now().isoformat(),))
+        if imported:
+            styler.success(f"Migrated {imported} chats from {self.csv_file_path} to {self.db_file_path}")
+
+    @staticmethod
+    def _to_row(info: ChatInfo) -> tuple:
+        return (info.chat_id, info.username or '', info.first_name or '', info.last_name or '', info.date_added, int(info.is_active))
+
+    @staticmethod
+    def _from_row(row: tuple) -> ChatInfo:
+        return ChatInfo(chat_id=row[0], username=row[1], first_name=row[2], last_name=row[3], date_added=row[4], is_active=bool(row[5]))
+
+    # Queries, executed on the worker thread
+
+    def _saveChat(self, chat_id: int, username: str, first_name: str, last_name: str) -> bool:
+        info = ChatInfo(
+            chat_id=chat_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            date_added=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            is_active=True
+        )
+        with self._connection as conn:
+            cursor = conn.execute('INSERT OR IGNORE INTO chats VALUES (?, ?, ?, ?, ?, ?)', self._to_row(info))
+        return cursor.rowcount > 0
+
+    def _saveChats(self, chat_infos: List[ChatInfo]) -> List[bool]:
+        date_added = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        results = []
+        with self._connection as conn:
+            for info in chat_infos:
+                info = replace(info, date_added=info.date_added or date_added, is_active=True)
+                cursor = conn.execute('INSERT OR IGNORE INTO chats VALUES (?, ?, ?, ?, ?, ?)', self._to_row(info))
+                results.append(cursor.rowcount > 0)
+        return results
+
+    def _getAllChatIds(self) -> List[int]:
+        rows = self._connection.execute('SELECT chat_id FROM chats WHERE is_active = 1').fetchall()
+        return [row[0] for row in rows]
+
+    def _filterActiveChatIds(self, chat_ids: List[int]) -> List[int]:
+        active = set()
+        # Chunked to stay below SQLite's limit of bound parameters
+        for start in range(0, len(chat_ids), 500):
+            chunk = chat_ids[start:start + 500]
+            rows = self._connection.execute(
+                f"SELECT chat_id FROM chats WHERE is_active = 1 AND chat_id IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            active.update(row[0] for row in rows)
+        return [chat_id for chat_id in chat_ids if chat_id in active]
+
+    def _get_all_chat_info(self) -> List[ChatInfo]:
+        rows = self._connection.execute('SELECT * FROM chats').fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def _get_chat_info(self, chat_id: int) -> Optional[ChatInfo]:
+        row = self._connection.execute('SELECT * FROM chats WHERE chat_id = ?', (chat_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def _delete_chat_id(self, chat_id: int) -> bool:
+        with self._connection as conn:
+            cursor = conn.execute('DELETE FROM chats WHERE chat_id = ?', (chat_id,))
+        return cursor.rowcount > 0
+
+    def _set_chat_active(self, chat_id: int, is_active: bool) -> bool:
+        with self._connection as conn:
+            cursor = conn.execute('UPDATE chats SET is_active = ? WHERE chat_id = ?', (int(is_active), chat_id))
+        return cursor.rowcount > 0
+
+    def _deactivate_chat_ids(self, chat_ids: List[int]) -> int:
+        with self._connection as conn:
+            cursor = conn.executemany('UPDATE chats SET is_active = 0 WHERE chat_id = ? AND is_active = 1', [(chat_id,) for chat_id in set(chat_ids)])
+        return cursor.rowcount
+
+    def _get_statistics(self) -> Dict[str, Any]:
+        total_count, active_count = self._connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(is_active), 0) FROM chats'
+        ).fetchone()
+        return {
+            'total_chats': total_count,
+            'active_chats': active_count,
+            'inactive_chats': total_count - active_count,
+            'db_file_path': self.db_file_path
+        }
+
+    def _clear_all_chat_ids(self) -> None:
+        with self._connection as conn:
+            conn.execute('DELETE FROM chats')
+
+    # Public API, same as StorageService
+
+    def saveChat(self, chat_id: int, username: str = "", first_name: str = "", last_name: str = "") -> bool:
+        """
+        Save a new chat ID
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            if self._call(self._saveChat, chat_id, username, first_name, last_name):
+                styler.success(f"Chat ID {chat_id} saved successfully")
+                return True
+            styler.info(f"Chat ID {chat_id} already exists")
+            return False
+        except Exception as e:
+            styler.error(f"Error saving chat ID: {e}")
+            return False
+
+
+    def saveChats(self, chat_infos: List[ChatInfo]) -> List[bool]:
+        """
+        Save several new chats in one transaction
+        
+        Returns:
+            List[bool]: For each chat, True if it was saved
+        """
+        try:
+            results = self._call(self._saveChats, chat_infos)
+            if any(results):
+                styler.success(f"{sum(results)} chat IDs saved successfully")
+            return results
+        except Exception as e:
+            styler.error(f"Error saving chat IDs: {e}")
+            return [False] * len(chat_infos)
+
+    def getAllChatIds(self) -> List[int]:
+        """
+        Get all active chat IDs
+        
+        Returns:
+            List[int]: List of all chat IDs
+        """
+        try:
+            return self._call(self._getAllChatIds)
+        except Exception as e:
+            styler.error(f"Error reading chat IDs: {e}")
+            return []
+
+
+    def filterActiveChatIds(self, chat_ids: List[int]) -> List[int]:
+        """
+        Keep the chats of `chat_ids` that are stored and active
+        
+        Returns:
+            List[int]: Active chat IDs, in the given order
+        """
+        try:
+            return self._call(self._filterActiveChatIds, list(chat_ids))
+        except Exception as e:
+            styler.error(f"Error reading chat IDs: {e}")
+            return []
+
+    def get_all_chat_info(self) -> List[ChatInfo]:
+        """
+        Get all chat information
+        
+        Returns:
+            List[ChatInfo]: List of all chat info objects
+        """
+        try:
+            return self._call(self._get_all_chat_info)
+        except Exception as e:
+            styler.error(f"Error reading chat info: {e}")
+            return []
+
+    def get_active_chat_ids(self) -> List[int]:
+        """
+        Get only active chat IDs
+        
+        Returns:
+            List[int]: List of active chat IDs
+        """
+        return self.getAllChatIds()
+
+    def get_chat_info(self, chat_id: int) -> Optional[ChatInfo]:
+        """
+        Get information for a specific chat ID
+        
+        Returns:
+            ChatInfo or None: Chat information if found
+        """
+        try:
+            return self._call(self._get_chat_info, chat_id)
+        except Exception as e:
+            styler.error(f"Error reading chat info: {e}")
+            return None
+
+
+    def delete_chat_id(self, chat_id: int) -> bool:
+        """
+        Delete a chat ID
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            if self._call(self._delete_chat_id, chat_id):
+                styler.success(f"Chat ID {chat_id} deleted successfully")
+                return True
+            styler.warning(f"Chat ID {chat_id} not found")
+            return False
+        except Exception as e:
+            styler.error(f"Error deleting chat ID: {e}")
+            return False
+
+    def deactivate_chat_id(self, chat_id: int) -> bool:
+        """
+        Mark a chat ID as inactive (soft delete)
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            if self._call(self._set_chat_active, chat_id, False):
+                styler.success(f"Chat ID {chat_id} deactivated successfully")
+                return True
+            styler.warning(f"Chat ID {chat_id} not found")
+            return False
+        except Exception as e:
+            styler.error(f"Error deactivating chat ID: {e}")
+            return False
+
+    def deactivate_chat_ids(self, chat_ids: List[int]) -> int:
+        """
+        Mark several chat IDs as inactive in one transaction
+        
+        Returns:
+            int: Number of chats that got deactivated
+        """
+        try:
+            count = self._call(self._deactivate_chat_ids, chat_ids)
+            if count:
+                styler.success(f"{count} chat IDs deactivated successfully")
+            return count
+        except Exception as e:
+            styler.error(f"Error deactivating chat IDs: {e}")
+            return 0
+
+    def activate_chat_id(self, chat_id: int) -> bool:
+        """
+        Mark a chat ID as active
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            if self._call(self._set_chat_active, chat_id, True):
+                styler.success(f"Chat ID {chat_id} activated successfully")
+                return True
+            styler.warning(f"Chat ID {chat_id} not found")
+            return False
+        except Exception as e:
+            styler.error(f"Error activating chat ID: {e}")
+            return False
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about stored chat IDs, counted by the database
+        
+        Returns:
+            dict: Statistics about chat IDs
+        """
+        return self._call(self._get_statistics)
+
+    def clear_all_chat_ids(self) -> bool:
+        """
+        Clear all chat IDs
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            self._call(self._clear_all_chat_ids)
+            styler.success("All chat IDs cleared successfully")
+            return True
+        except Exception as e:
+            styler.error(f"Error clearing chat IDs: {e}")
+            return False
@@ -0,0 +1,81 @@
+import threading
+from typing import Optional
+from config import config
+from .storageService import StorageService
+from .journalStorageService import JournalStorageService
+from .sqliteStorageService import SqliteStorageService
+from .asyncStorageService import AsyncStorageService
+from .subscriptionService import SubscriptionService
+
+
+def createStorageService(mode: str = 'csv') -> StorageService:
+    """
+    Create the chat storage for a `storage-mode` config value
+
+    Args:
+        mode: 'csv' rewrites the CSV file on every change, 'journal' appends
+            changes to a journal that is compacted in the background, 'sqlite'
+            keeps chats in an SQLite database (importing chat_ids.csv once)
+
+    Returns:
+        StorageService: Storage instance
+    """
+    if mode == 'csv':
+        return StorageService()
+    if mode == 'journal':
+        return JournalStorageService(compact_threshold_bytes=config.get('journal-compact-bytes', 1024 * 1024))
+    if mode == 'sqlite':
+        return SqliteStorageService(config.get('sqlite-path'))
+    raise ValueError(f"Unknown storage mode: {mode}")
+
+
+# Reentrant, the subscriptions are seeded from the storage while holding it
+_lock = threading.RLock()
+_storageService: Optional[StorageService] = None
+_asyncStorageService: Optional[AsyncStorageService] = None
+_subscriptionService: Optional[SubscriptionService] = None
+
+
+def getStorageService() -> StorageService:
+    """Return the singleton storage, creating it from the config on first use"""
+    global _storageService
+    with _lock:
+        if _storageService is None:
+            _storageService = createStorageService(config.get('storage-mode', 'csv'))
+        return _storageService
+
+
+def getAsyncStorageService() -> AsyncStorageService:
+    """Return the singleton async facade; the storage behind it is created on its first call"""
+    global _asyncStorageService
+    with _lock:
+        if _asyncStorageService is None:
+            _asyncStorageService = AsyncStorageService(
+                getStorageService,
+                max_workers=config.get('storage-io-workers', 2),
+                batch_window_seconds=config.get('registration-batch-seconds', 0.05)
+            )
+        return _asyncStorageService
+
+
+def getSubscriptionService() -> SubscriptionService:
+    """Return the singleton location subscriptions, created on first use"""
+    global _subscriptionService
+    with _lock:
+        if _subscriptionService is None:
+            _subscriptionService = SubscriptionService(
+                config.get('subscriptions-path'),
+                initialChatIds=lambda: getStorageService().getAllChatIds()
+            )
+        return _subscriptionService
+
+
+def __getattr__(name: str):
+    # The singletons are created on first access rather than at import time
+    if name == 'storageService':
+        return getStorageService()
+    if name == 'asyncStorageService':
+        return getAsyncStorageService()
+    if name == 'subscriptionService':
+        return getSubscriptionService()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,13 @@
 import csv
 import os
+import threading
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, Tuple
+from dataclasses import dataclass, replace
 from utils import styler
 
+FIELDNAMES = ['chat_id', 'username', 'first_name', 'last_name', 'date_added', 'is_active']
+
 @dataclass
 class ChatInfo:
     """Data class for chat information"""
@@ -50,16 +53,72 @@ class StorageService:
         else:
             self.csv_file_path = csv_file_path
         
+        # In-memory registry keyed by chat_id. It is reloaded when the file is
+        # changed by someone else and updated in place by our own writes.
+        self._lock = threading.RLock()
+        self._chatIndex: Optional[Dict[int, ChatInfo]] = None
+        self._activeChatIds: Optional[List[int]] = None
+        self._fileSignature: Optional[Tuple[int, int]] = None
+        
         self._ensure_csv_exists()
     
     def _ensure_csv_exists(self):
         """Ensure the CSV file exists with proper headers"""
         if not os.path.exists(self.csv_file_path):
             with open(self.csv_file_path, 'w', newline='', encoding='utf-8') as file:
-                fieldnames = ['chat_id', 'username', 'first_name', 'last_name', 'date_added', 'is_active']
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
+                writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
                 writer.writeheader()
     
+    def _getFileSignature(self) -> Optional[Tuple[int, int]]:
+        """Modification time and size of the CSV file, None if it is missing"""
+        try:
+            stat = os.stat(self.csv_file_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _read_chat_info_file(self) -> List[ChatInfo]:
+        """Parse every row of the CSV file, skipping malformed ones"""
+        chat_infos = []
+        with open(self.csv_file_path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                try:
+                    chat_infos.append(ChatInfo.from_dict(row))
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    styler.warning(f"Skipping malformed line {reader.line_num} of {self.csv_file_path}: {e}")
+        return chat_infos
+    
+    def _getIndex(self) -> Dict[int, ChatInfo]:
+        """
+        Get the chat registry, reloading it if the file changed on disk
+        
+        Raises:
+            FileNotFoundError: If the CSV file does not exist
+        """
+        with self._lock:
+            signature = self._getFileSignature()
+            if self._chatIndex is None or signature != self._fileSignature:
+                chat_infos = self._read_chat_info_file()
+                self._setIndex({info.chat_id: info for info in chat_infos})
+                self._fileSignature = signature
+            return self._chatIndex
+    
+    def _setIndex(self, index: Dict[int, ChatInfo]) -> None:
+        self._chatIndex = index
+        self._activeChatIds = None
+    
+    def _markWritten(self) -> None:
+        """Remember the file state produced by our own write so it is not re-read"""
+        self._fileSignature = self._getFileSignature()
+    
+    def _getActiveChatIds(self) -> List[int]:
+        with self._lock:
+            index = self._getIndex()
+            if self._activeChatIds is None:
+                self._activeChatIds = [info.chat_id for info in index.values() if info.is_active]
+            return self._activeChatIds
+    
     def saveChat(self, chat_id: int, username: str = "", first_name: str = "", last_name: str = "") -> bool:
         """
         Save a new chat ID to the CSV file
@@ -74,25 +133,28 @@ class StorageService:
             bool: True if successful, False otherwise
         """
         try:
-            # Check if chat_id already exists
-            if self.get_chat_info(chat_id):
-                styler.info(f"Chat ID {chat_id} already exists")
-                return False
-            
-            chat_info = ChatInfo(
-                chat_id=chat_id,
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-                date_added=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                is_active=True
-            )
-            
-            fieldnames = ['chat_id', 'username', 'first_name', 'last_name', 'date_added', 'is_active']
-            
-            with open(self.csv_file_path, 'a', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writerow(chat_info.to_dict())
+            with self._lock:
+                index = self._getIndex()
+                
+                # Check if chat_id already exists
+                if chat_id in index:
+                    styler.info(f"Chat ID {chat_id} already exists")
+                    return False
+                
+                chat_info = ChatInfo(
+                    chat_id=chat_id,
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    date_added=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    is_active=True
+                )
+                
+                self._persist_new_chats([chat_info])
+                
+                index[chat_id] = chat_info
+                if self._activeChatIds is not None:
+                    self._activeChatIds.append(chat_id)
             
             styler.success(f"Chat ID {chat_id} saved successfully")
             return True
@@ -101,21 +163,71 @@ class StorageService:
             styler.error(f"Error saving chat ID: {e}")
             return False
     
+    def saveChats(self, chat_infos: List[ChatInfo]) -> List[bool]:
+        """
+        Save several new chats with a single write
+        
+        Args:
+            chat_infos: Chats to save. An empty date_added is set to now.
+            
+        Returns:
+            List[bool]: For each chat, True if it was saved, False if it already
+                existed or the write failed
+        """
+        try:
+            with self._lock:
+                index = self._getIndex()
+                date_added = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                new_chats: Dict[int, ChatInfo] = {}
+                results = []
+                
+                for info in chat_infos:
+                    is_new = info.chat_id not in index and info.chat_id not in new_chats
+                    if is_new:
+                        new_chats[info.chat_id] = replace(info, date_added=info.date_added or date_added, is_active=True)
+                    results.append(is_new)
+                
+                if new_chats:
+                    self._persist_new_chats(list(new_chats.values()))
+                    index.update(new_chats)
+                    if self._activeChatIds is not None:
+                        self._activeChatIds.extend(new_chats)
+            
+            if new_chats:
+                styler.success(f"{len(new_chats)} chat IDs saved successfully")
+            return results
+            
+        except Exception as e:
+            styler.error(f"Error saving chat IDs: {e}")
+            return [False] * len(chat_infos)
+    
     def getAllChatIds(self) -> List[int]:
         """
-        Get all chat IDs from the CSV file
+        Get all active chat IDs, served from the in-memory registry
         
         Returns:
             List[int]: List of all chat IDs
         """
         try:
-            chat_ids = []
-            with open(self.csv_file_path, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row.get('is_active', 'True').lower() == 'true':
-                        chat_ids.append(int(row['chat_id']))
-            return chat_ids
+            return list(self._getActiveChatIds())
+        except FileNotFoundError:
+            styler.error(f"CSV file not found: {self.csv_file_path}")
+            return []
+        except Exception as e:
+            styler.error(f"Error reading chat IDs: {e}")
+            return []
+    
+    def filterActiveChatIds(self, chat_ids: List[int]) -> List[int]:
+        """
+        Keep the chats of `chat_ids` that are stored and active, looked up one by one
+        
+        Returns:
+            List[int]: Active chat IDs, in the given order
+        """
+        try:
+            with self._lock:
+                index = self._getIndex()
+                return [chat_id for chat_id in chat_ids if chat_id in index and index[chat_id].is_active]
         except FileNotFoundError:
             styler.error(f"CSV file not found: {self.csv_file_path}")
             return []
@@ -131,12 +243,8 @@ class StorageService:
             List[ChatInfo]: List of all chat info objects
         """
         try:
-            chat_infos = []
-            with open(self.csv_file_path, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    chat_infos.append(ChatInfo.from_dict(row))
-            return chat_infos
+            with self._lock:
+                return [replace(info) for info in self._getIndex().values()]
         except FileNotFoundError:
             styler.error(f"CSV file not found: {self.csv_file_path}")
             return []
@@ -151,8 +259,7 @@ class StorageService:
         Returns:
             List[int]: List of active chat IDs
         """
-        all_info = self.get_all_chat_info()
-        return [info.chat_id for info in all_info if info.is_active]
+        return self.getAllChatIds()
     
     def get_chat_info(self, chat_id: int) -> Optional[ChatInfo]:
         """
@@ -164,11 +271,16 @@ class StorageService:
         Returns:
             ChatInfo or None: Chat information if found
         """
-        all_info = self.get_all_chat_info()
-        for info in all_info:
-            if info.chat_id == chat_id:
-                return info
-        return None
+        try:
+            with self._lock:
+                info = self._getIndex().get(chat_id)
+                return replace(info) if info else None
+        except FileNotFoundError:
+            styler.error(f"CSV file not found: {self.csv_file_path}")
+            return None
+        except Exception as e:
+            styler.error(f"Error reading chat info: {e}")
+            return None
     
     def delete_chat_id(self, chat_id: int) -> bool:
         """
@@ -181,24 +293,70 @@ class StorageService:
             bool: True if successful, False otherwise
         """
         try:
-            all_info = self.get_all_chat_info()
-            original_count = len(all_info)
-            
-            # Filter out the chat_id to delete
-            filtered_info = [info for info in all_info if info.chat_id != chat_id]
-            
-            if len(filtered_info) < original_count:
-                self._write_all_chat_info(filtered_info)
-                styler.success(f"Chat ID {chat_id} deleted successfully")
-                return True
-            else:
-                styler.warning(f"Chat ID {chat_id} not found")
-                return False
+            with self._lock:
+                index = self._getIndex()
+                
+                if chat_id in index:
+                    self._persist_delete(chat_id)
+                    del index[chat_id]
+                    self._activeChatIds = None
+                    styler.success(f"Chat ID {chat_id} deleted successfully")
+                    return True
+                else:
+                    styler.warning(f"Chat ID {chat_id} not found")
+                    return False
                 
         except Exception as e:
             styler.error(f"Error deleting chat ID: {e}")
             return False
     
+    def _set_chat_active(self, chat_id: int, is_active: bool) -> bool:
+        """
+        Update the is_active flag of a chat and rewrite the file
+        
+        Returns:
+            bool: True if the chat was found and written
+        """
+        with self._lock:
+            index = self._getIndex()
+            info = index.get(chat_id)
+            if info is None:
+                return False
+            
+            self._persist_chats_active([chat_id], is_active)
+            info.is_active = is_active
+            self._activeChatIds = None
+            return True
+    
+    def deactivate_chat_ids(self, chat_ids: List[int]) -> int:
+        """
+        Mark several chat IDs as inactive with a single write
+        
+        Args:
+            chat_ids: Chat IDs to deactivate
+            
+        Returns:
+            int: Number of chats that were active and got deactivated
+        """
+        try:
+            with self._lock:
+                index = self._getIndex()
+                to_deactivate = [chat_id for chat_id in dict.fromkeys(chat_ids) if chat_id in index and index[chat_id].is_active]
+                if not to_deactivate:
+                    return 0
+                
+                self._persist_chats_active(to_deactivate, False)
+                for chat_id in to_deactivate:
+                    index[chat_id].is_active = False
+                self._activeChatIds = None
+            
+            styler.success(f"{len(to_deactivate)} chat IDs deactivated successfully")
+            return len(to_deactivate)
+            
+        except Exception as e:
+            styler.error(f"Error deactivating chat IDs: {e}")
+            return 0
+    
     def deactivate_chat_id(self, chat_id: int) -> bool:
         """
         Mark a chat ID as inactive (soft delete)
@@ -210,17 +368,7 @@ class StorageService:
             bool: True if successful, False otherwise
         """
         try:
-            all_info = self.get_all_chat_info()
-            updated = False
-            
-            for info in all_info:
-                if info.chat_id == chat_id:
-                    info.is_active = False
-                    updated = True
-                    break
-            
-            if updated:
-                self._write_all_chat_info(all_info)
+            if self._set_chat_active(chat_id, False):
                 styler.success(f"Chat ID {chat_id} deactivated successfully")
                 return True
             else:
@@ -242,17 +390,7 @@ class StorageService:
             bool: True if successful, False otherwise
         """
         try:
-            all_info = self.get_all_chat_info()
-            updated = False
-            
-            for info in all_info:
-                if info.chat_id == chat_id:
-                    info.is_active = True
-                    updated = True
-                    break
-            
-            if updated:
-                self._write_all_chat_info(all_info)
+            if self._set_chat_active(chat_id, True):
                 styler.success(f"Chat ID {chat_id} activated successfully")
                 return True
             else:
@@ -263,9 +401,46 @@ class StorageService:
             styler.error(f"Error activating chat ID: {e}")
             return False
     
+    def _persist_new_chats(self, chat_infos: List[ChatInfo]) -> None:
+        """Store new chats on disk by appending CSV rows in one write"""
+        with open(self.csv_file_path, 'a', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            writer.writerows(info.to_dict() for info in chat_infos)
+        self._markWritten()
+    
+    def _persist_chats_active(self, chat_ids: List[int], is_active: bool) -> None:
+        """Store changed is_active flags on disk by rewriting the CSV file once"""
+        chat_ids = set(chat_ids)
+        updated = [replace(info, is_active=is_active) if info.chat_id in chat_ids else info for info in self._getIndex().values()]
+        self._write_csv_file(self.csv_file_path, updated)
+        self._markWritten()
+    
+    def _persist_delete(self, chat_id: int) -> None:
+        """Remove a chat from disk by rewriting the CSV file"""
+        filtered_info = [info for info in self._getIndex().values() if info.chat_id != chat_id]
+        self._write_csv_file(self.csv_file_path, filtered_info)
+        self._markWritten()
+    
+    @staticmethod
+    def _write_csv_file(path: str, chat_infos: List[ChatInfo]) -> None:
+        """
+        Write chat info to a CSV file atomically: the rows go to a temporary
+        file that then replaces the target, so a crash never leaves it truncated
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            for info in chat_infos:
+                writer.writerow(info.to_dict())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    
     def _write_all_chat_info(self, chat_infos: List[ChatInfo]) -> bool:
         """
         Write all chat info to the CSV file (overwrites existing file)
+        and make it the in-memory registry
         
         Args:
             chat_infos: List of chat info to write
@@ -274,13 +449,10 @@ class StorageService:
             bool: True if successful, False otherwise
         """
         try:
-            fieldnames = ['chat_id', 'username', 'first_name', 'last_name', 'date_added', 'is_active']
-            
-            with open(self.csv_file_path, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                for info in chat_infos:
-                    writer.writerow(info.to_dict())
+            with self._lock:
+                self._write_csv_file(self.csv_file_path, chat_infos)
+                self._setIndex({info.chat_id: info for info in chat_infos})
+                self._markWritten()
             return True
         except Exception as e:
             styler.error(f"Error writing chat info: {e}")
@@ -293,12 +465,20 @@ class StorageService:
         Returns:
             dict: Statistics about chat IDs
         """
-        all_info = self.get_all_chat_info()
-        active_count = sum(1 for info in all_info if info.is_active)
-        inactive_count = len(all_info) - active_count
+        try:
+            with self._lock:
+                total_count = len(self._getIndex())
+                active_count = len(self._getActiveChatIds())
+        except FileNotFoundError:
+            styler.error(f"CSV file not found: {self.csv_file_path}")
+            total_count = active_count = 0
+        except Exception as e:
+            styler.error(f"Error reading chat info: {e}")
+            total_count = active_count = 0
+        inactive_count = total_count - active_count
         
         return {
-            'total_chats': len(all_info),
+            'total_chats': total_count,
             'active_chats': active_count,
             'inactive_chats': inactive_count,
             'csv_file_path': self.csv_file_path
@@ -312,12 +492,10 @@ class StorageService:
             bool: True if successful, False otherwise
         """
         try:
-            self._write_all_chat_info([])
+            if not self._write_all_chat_info([]):
+                return False
             styler.success("All chat IDs cleared successfully")
             return True
         except Exception as e:
             styler.error(f"Error clearing chat IDs: {e}")
             return False
-
-# Create a singleton instance
-storageService = StorageService()
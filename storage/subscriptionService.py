@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from utils import styler
+
+# Bucket of chats subscribed to every location
+ALL_LOCATIONS = '*'
+
+
+class SubscriptionService:
+    """
+    Which chats want notifications about which location.
+
+    Kept as an inverted index, location -> set of chat IDs, so a state change
+    of one location fans out to its subscribers plus the ALL_LOCATIONS bucket
+    without looking at any other chat. A reverse map chat -> locations serves
+    per-chat changes. The index is persisted as JSON, rewritten atomically on
+    every change.
+    """
+
+    def __init__(self, json_file_path: str = None, initialChatIds: Optional[Callable[[], List[int]]] = None):
+        """
+        Initialize the subscriptions
+
+        Args:
+            json_file_path: Path to the subscriptions file. If None, uses default path.
+            initialChatIds: Called when the file does not exist yet; the chats it
+                returns are subscribed to all locations, so chats registered
+                before subscriptions existed keep getting every notification
+        """
+        if json_file_path is None:
+            current_dir = os.path.dirname(__file__)
+            json_file_path = os.path.join(current_dir, 'subscriptions.json')
+        self.json_file_path = json_file_path
+
+        self._lock = threading.RLock()
+        self._subscribers: Dict[str, Set[int]] = {}
+        self._chatLocations: Dict[int, Set[str]] = {}
+        self._load(initialChatIds)
+
+    def _load(self, initialChatIds: Optional[Callable[[], List[int]]]) -> None:
+        try:
+            with open(self.json_file_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            chatIds = initialChatIds() if initialChatIds else []
+            data = {ALL_LOCATIONS: chatIds} if chatIds else {}
+            if chatIds:
+                styler.info(f"Subscribed {len(chatIds)} existing chats to all locations")
+        except Exception as e:
+            styler.error(f"Error loading subscriptions: {e}")
+            data = {}
+
+        for location, chatIds in data.items():
+            for chatId in chatIds:
+                self._add(int(chatId), location)
+        if not os.path.exists(self.json_file_path) and self._subscribers:
+            self._save()
+
+    def _save(self) -> None:
+        data = {location: sorted(chatIds) for location, chatIds in self._subscribers.items() if chatIds}
+        tmp_path = f"{self.json_file_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.json_file_path)
+        except Exception as e:
+            styler.error(f"Error saving subscriptions: {e}")
+
+    def _add(self, chatId: int, location: str) -> bool:
+        if location in self._chatLocations.get(chatId, ()):
+            return False
+        self._subscribers.setdefault(location, set()).add(chatId)
+        self._chatLocations.setdefault(chatId, set()).add(location)
+        return True
+
+    def _remove(self, chatId: int, location: str) -> bool:
+        locations = self._chatLocations.get(chatId)
+        if not locations or location not in locations:
+            return False
+        locations.discard(location)
+        if not locations:
+            del self._chatLocations[chatId]
+        chatIds = self._subscribers[location]
+        chatIds.discard(chatId)
+        if not chatIds:
+            del self._subscribers[location]
+        return True
+
+    def getSubscribers(self, location: str) -> List[int]:
+        """Chats to notify about `location`: its own subscribers and those of all locations"""
+        with self._lock:
+            return list(self._subscribers.get(location, set()) | self._subscribers.get(ALL_LOCATIONS, set()))
+
+    def getLocations(self, chatId: int) -> Set[str]:
+        """Locations a chat is subscribed to, may contain ALL_LOCATIONS"""
+        with self._lock:
+            return set(self._chatLocations.get(chatId, ()))
+
+    def subscribe(self, chatId: int, location: str = ALL_LOCATIONS) -> bool:
+        """
+        Subscribe a chat to a location, or to all of them with ALL_LOCATIONS.
+        A chat picking a single location stops getting all of them.
+
+        Returns:
+            bool: True if the subscriptions changed
+        """
+        with self._lock:
+            changed = self._add(chatId, location)
+            if location == ALL_LOCATIONS:
+                # Covered by the all bucket now
+                for other in self.getLocations(chatId) - {ALL_LOCATIONS}:
+                    changed = self._remove(chatId, other) or changed
+            else:
+                changed = self._remove(chatId, ALL_LOCATIONS) or changed
+            if changed:
+                self._save()
+            return changed
+
+    def subscribeDefault(self, chatId: int) -> bool:
+        """Subscribe a chat to all locations unless it already has subscriptions"""
+        with self._lock:
+            if chatId in self._chatLocations:
+                return False
+            return self.subscribe(chatId, ALL_LOCATIONS)
+
+    def unsubscribe(self, chatId: int, location: Optional[str] = None) -> bool:
+        """
+        Unsubscribe a chat from a location, or from everything if `location` is None
+
+        Returns:
+            bool: True if the subscriptions changed
+        """
+        with self._lock:
+            locations = [location] if location is not None else list(self.getLocations(chatId))
+            changed = False
+            for item in locations:
+                changed = self._remove(chatId, item) or changed
+            if changed:
+                self._save()
+            return changed
+
+    def removeChats(self, chatIds: List[int]) -> int:
+        """
+        Drop all subscriptions of chats that can no longer be reached, with one write
+
+        Returns:
+            int: Number of chats that had subscriptions
+        """
+        with self._lock:
+            removed = 0
+            for chatId in chatIds:
+                locations = list(self._chatLocations.get(chatId, ()))
+                for location in locations:
+                    self._remove(chatId, location)
+                removed += bool(locations)
+            if removed:
+                self._save()
+            return removed
+
+    def get_statistics(self) -> Dict[str, int]:
+        """Number of subscribed chats per location"""
+        with self._lock:
+            return {location: len(chatIds) for location, chatIds in self._subscribers.items()}
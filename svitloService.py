@@ -1,103 +1,221 @@
 from datetime import datetime, timedelta
 import asyncio
-from typing import Optional
-from config import config
+import time
+from typing import Optional, List, Dict, Set
+from config import config, Target, getTargets
 import state
 from utils import styler, networkService
-from state import stateService
-from tgService import tgService
-
-# Import the telegram service (avoid circular import by importing when needed)
-_tg_service = None
+from utils.scheduler import ProbeScheduler, ScheduleSettings, ACTIVITY_CHANGED, ACTIVITY_PENDING, ACTIVITY_STABLE
+from utils.startupTimer import startupTimer
+from utils.singleFlight import SingleFlight
+from state import getStateService
+from state.types import TransitionPolicy
 
 
 class SvitloService():
     def __init__(self):
-        pass
+        self._targets: List[Target] = []
+        self._scheduler: Optional[ProbeScheduler] = None
+        # Created on the first on-demand check, once the config is loaded
+        self._checkFlight: Optional[SingleFlight] = None
+        # Announcements started by on-demand checks, referenced until they finish
+        self._announceTasks: Set[asyncio.Task] = set()
+        # Registered by main once it has imported the Telegram stack off the loop
+        self._tgService = None
+        self._tgServiceSet = asyncio.Event()
 
     def setTelegramService(self, tg_service):
         """Set the telegram service for sending notifications"""
-        global _tg_service
-        _tg_service = tg_service
+        self._tgService = tg_service
+        self._tgServiceSet.set()
 
-    async def checkStatus(self, ipAddress: str) -> bool:
-        result = await networkService.ping(ipAddress)
+    async def checkStatus(self, target: Target) -> bool:
+        """
+        Probe a target and apply the result. A confirmed change is announced
+        by a task of its own, the caller does not wait for the broadcast.
+        """
+        result = await networkService.ping(target)
 
-        await self.updateSvitloState(isOn=result)
+        confirmed = await self._applyProbe(target, isOn=result)
+        if confirmed is not None:
+            task = asyncio.create_task(self._announce(target, confirmed))
+            self._announceTasks.add(task)
+            task.add_done_callback(self._announceTasks.discard)
 
         return result
+
+
+    def getTargets(self) -> List[Target]:
+        """Targets being checked, or the configured ones before checks started"""
+        return list(self._targets) or getTargets(config)
+
+
+    async def checkTargetNow(self, target: Target) -> bool:
+        """
+        Probe a target on demand, e.g. for /check
+
+        Concurrent requests for one target share a single probe, and its
+        result is reused for `check-cache-seconds`.
+        """
+        if self._checkFlight is None:
+            self._checkFlight = SingleFlight(config.get('check-cache-seconds', 10))
+        return await self._checkFlight.do(target.name, lambda: self.checkStatus(target))
+
+
+    async def _probeTarget(self, target: Target) -> str:
+        """Scheduler job: check one target and report how its state is moving"""
+        checkStartTime = time.monotonic()
+        result = await networkService.ping(target)
+        startupTimer.mark('first probe')
+        changed = await self.updateSvitloState(target, isOn=result)
+        styler.info(f"Check of {target.name} completed in {time.monotonic() - checkStartTime:.1f}s")
+
+        if changed:
+            return ACTIVITY_CHANGED
+        if getStateService().isChangePending(target.name):
+            return ACTIVITY_PENDING
+        return ACTIVITY_STABLE
     
     
-    async def runStatusChecksByTime(self, ipAddress: str, intervalSeconds: int, durationHours: Optional[int] = None) -> None:
+    async def runStatusChecksByTime(self, targets: List[Target], intervalSeconds: int, maxConcurrentProbes: int = 10, durationHours: Optional[int] = None) -> None:
         """
-        Run checkStatus at time intervals
+        Run checkStatus for all targets at time intervals
+        
+        Every target is probed on its own fixed-rate schedule of the monotonic
+        clock, faster right after a state change and while a change waits for
+        confirmation.
         
         Args:
+            targets: Locations to check
             intervalSeconds: Time between checks in seconds (default: 30)
+            maxConcurrentProbes: How many targets are pinged at the same time
             durationHours: Total duration in hours (None for infinite)
         """
+        self._targets = list(targets)
+        settings = self._buildScheduleSettings(config, intervalSeconds)
+        scheduler = self._scheduler = ProbeScheduler(self._probeTarget, settings, maxConcurrentProbes, keyFunc=lambda target: target.name)
+        scheduler.setItems(self._targets)
         
-        # Calculate end time if duration is specified
-        endTime = None
         if durationHours:
             endTime = datetime.now() + timedelta(hours=durationHours)
             styler.info(f"Status checks will run until {endTime.strftime('%Y-%m-%d %H:%M:%S')}")
         
+        styler.network(f"Checking {len(self._targets)} targets every {intervalSeconds}s")
         try:
-            while True:
-                styler.printSeparator()
-                
-                currentTime = datetime.now()
-                
-                # Check if we've reached the end time
-                if endTime and currentTime >= endTime:
-                    styler.info(f"\nDuration limit reached. Stopping status checks.")
-                    break
-                
-                styler.network(f"\n--- Status Check {currentTime.strftime('%H:%M:%S')} ---")
-                
-                # Run the status check
-                checkStartTime = datetime.now()
-                await svitloService.checkStatus(ipAddress)
-                checkDuration = (datetime.now() - checkStartTime).total_seconds()
-                
-                styler.info(f"Check completed in {checkDuration:.1f}s")
-                
-                # Calculate next check time and wait
-                nextCheckTime = currentTime + timedelta(seconds=intervalSeconds)
-                remainingTime = intervalSeconds - checkDuration
-                
-                if remainingTime > 0:
-                    styler.info(f"Next check at {nextCheckTime.strftime('%H:%M:%S')} (waiting {remainingTime/60:.1f} minutes)")
-                    await asyncio.sleep(remainingTime)
-                else:
-                    styler.info(f"Check took longer than interval. Starting next check immediately.")
+            await scheduler.run(durationHours * 3600 if durationHours else None)
+            if durationHours:
+                styler.info(f"\nDuration limit reached. Stopping status checks.")
                     
         except KeyboardInterrupt:
             styler.warning(f"\nStatus checking stopped by user at {datetime.now().strftime('%H:%M:%S')}")
 
 
-    async def updateSvitloState(self, isOn: bool) -> None:
-        currentState = stateService.getElectricityState()
+    @staticmethod
+    def _buildScheduleSettings(configData: Dict, intervalSeconds: float) -> ScheduleSettings:
+        return ScheduleSettings(
+            intervalSeconds=intervalSeconds,
+            fastIntervalSeconds=configData.get('fast-interval-seconds', max(5, intervalSeconds / 3)),
+            maxIntervalSeconds=configData.get('max-interval-seconds', intervalSeconds),
+            backoffFactor=configData.get('interval-backoff-factor', 1.5),
+            pendingIntervalSeconds=configData.get('confirm-interval-seconds', 5),
+            jitterSeconds=configData.get('schedule-jitter-seconds', 0),
+            missedTicks=configData.get('missed-tick-policy', 'skip')
+        )
+
+
+    def applyConfig(self, oldConfig: Dict, newConfig: Dict) -> None:
+        """
+        Config reload listener: update targets, schedule, probe and transition
+        settings of the running checks. State of targets that stay is kept.
+        """
+        if self._checkFlight is not None:
+            self._checkFlight.ttlSeconds = newConfig.get('check-cache-seconds', 10)
+        if self._scheduler is None:
+            return
+
+        self._scheduler.updateSettings(self._buildScheduleSettings(newConfig, newConfig.get('timeinterval-to-check', 30)))
+        self._scheduler.setMaxConcurrent(newConfig.get('max-concurrent-probes', 10))
+        self._targets = getTargets(newConfig)
+        self._scheduler.setItems(self._targets)
+        getStateService().setTransitionPolicy(TransitionPolicy.fromConfig(newConfig))
+
+        if any(oldConfig.get(key) != newConfig.get(key) for key in ('probe-backend', 'tcp-probe-ports')):
+            networkService.resetBackend()
+        styler.network(f"Checking {len(self._targets)} targets every {self._scheduler.settings.intervalSeconds}s")
+
+
+    async def updateSvitloState(self, target: Target, isOn: bool) -> bool:
+        """
+        Apply a probe result to the state of a target
         
-        if currentState.isOn == isOn:
-            return  # No change in state
+        Returns:
+            bool: True if a state change was confirmed and announced
+        """
+        confirmed = await self._applyProbe(target, isOn)
+        if confirmed is None:
+            return False  # No confirmed change in state
+
+        await self._announce(target, confirmed)
+        return True
+
+
+    async def _applyProbe(self, target: Target, isOn: bool) -> Optional[bool]:
+        """
+        Record a probe result in the state of a target
+        
+        Returns:
+            Optional[bool]: The confirmed new state, None if the state did not change
+        """
+        stateService = getStateService()
+        previousState = stateService.getElectricityState(target.name).isOn
 
-        styler.info(f"State change: electricity status from {currentState.isOn} to {isOn}")
-        stateService.setElectricityState(isOn)
-        await self._sendTgNotification(isOn=isOn)
+        confirmed = stateService.recordProbe(target.name, isOn)
+        if confirmed is None:
+            if stateService.isChangePending(target.name):
+                styler.warning(f"Possible state change of {target.name} to {not previousState}, waiting for confirmation")
+            return None
 
+        styler.info(f"State change: electricity status of {target.name} from {previousState} to {confirmed}")
+        stateService.setElectricityState(target.name, confirmed)
+        await asyncio.to_thread(
+            stateService.saveTransition, target.name, confirmed,
+            stateService.getElectricityState(target.name).lastUpdateTime.timestamp()
+        )
+        return confirmed
 
-    async def _sendTgNotification(self, isOn: bool) -> None:
+
+    async def _announce(self, target: Target, isOn: bool) -> None:
+        """Notify the chats about a confirmed change, then update the outage stats"""
+        await self._sendTgNotification(target, isOn=isOn)
+        await self._updateStats()
+
+
+    async def _updateStats(self) -> None:
+        """Fold the new transition into the outage rollups, off the event loop"""
+        try:
+            # NumPy is loaded by the first access, so that happens in the thread as well
+            await asyncio.to_thread(lambda: state.getStatsService().update())
+        except Exception as e:
+            styler.error(f"Error updating outage stats: {e}")
+
+
+    async def _sendTgNotification(self, target: Target, isOn: bool) -> None:
         """Send telegram notification about electricity state change"""
-        if not tgService:
-            return  # Telegram service not available
+        # Changes confirmed while the Telegram stack still loads wait for it
+        try:
+            await asyncio.wait_for(self._tgServiceSet.wait(), config.get('bot-ready-timeout-seconds', 30))
+        except asyncio.TimeoutError:
+            styler.error(f"Telegram service is not available, {target.name} change not announced")
+            return
 
-        status = stateService.getStatus()
-        message = f"{status['icon']} - {status['text']}"
+        status = getStateService().getStatus(target.name)
+        if len(self._targets) > 1:
+            message = f"{status['icon']} {target.name} - {status['text']}"
+        else:
+            message = f"{status['icon']} - {status['text']}"
 
         try:
-            await tgService.sendCustomMessage(message)
+            await self._tgService.sendCustomMessage(message, location=target.name)
         except Exception as e:
             styler.error(f"Failed to send telegram notification: {e}")
 
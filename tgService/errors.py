@@ -0,0 +1,25 @@
+from telegram.error import BadRequest, Forbidden
+
+# BadRequest descriptions meaning the chat will never accept a message again
+_DEAD_CHAT_DESCRIPTIONS = (
+    'chat not found',
+    'user is deactivated',
+    'peer_id_invalid',
+    'bot was kicked',
+    'bot was blocked',
+    'have no rights to send a message',
+)
+
+
+def isPermanentSendError(error: Exception) -> bool:
+    """
+    Check if a send error means the chat is gone for good: the bot was
+    blocked or kicked, or the user or chat was deleted. Such chats can be
+    deactivated instead of being retried.
+    """
+    if isinstance(error, Forbidden):
+        return True
+    if isinstance(error, BadRequest):
+        description = str(error).lower()
+        return any(text in description for text in _DEAD_CHAT_DESCRIPTIONS)
+    return False
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from utils import styler
+from utils.metrics import broadcastDuration
+from .errors import isPermanentSendError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    attempt INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    batch_id TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_next_attempt_at ON outbox (next_attempt_at);
+"""
+
+
+@dataclass
+class OutboxMessage:
+    id: int
+    chat_id: int
+    message: str
+    attempt: int
+    next_attempt_at: float
+    batch_id: str
+
+
+@dataclass
+class _BatchProgress:
+    message: str
+    total: int
+    startedAt: float
+    sent: int = 0
+    failed: int = 0
+
+
+class NotificationOutbox:
+    """
+    Persistent queue of outgoing messages drained by a pool of async workers.
+
+    Messages are stored in SQLite before they are sent and removed once
+    delivered, so a crash in the middle of a broadcast resumes on the next
+    start. Failed sends are retried with exponential backoff until
+    `maxAttempts` is reached.
+    """
+
+    def __init__(self, send: Callable[[int, str], Awaitable[None]], db_file_path: str = None, workers: int = 20,
+                 maxAttempts: int = 5, baseDelaySeconds: float = 2, maxDelaySeconds: float = 600,
+                 onDeadChats: Optional[Callable[[List[int]], Awaitable[None]]] = None):
+        """
+        Initialize the outbox
+        
+        Args:
+            send: Coroutine delivering one message to one chat, raising on failure
+            db_file_path: Path to the outbox database. If None, uses default path.
+            workers: Number of concurrent senders
+            maxAttempts: Attempts before a message is dropped
+            baseDelaySeconds: Delay before the first retry, doubled on every next one
+            maxDelaySeconds: Upper limit of the retry delay
+            onDeadChats: Called with the chats that failed with a permanent error,
+                once per finished batch (or when the outbox goes idle)
+        """
+        if db_file_path is None:
+            current_dir = os.path.dirname(__file__)
+            db_file_path = os.path.join(current_dir, 'outbox.sqlite3')
+        self.db_file_path = db_file_path
+        self.send = send
+        self.workers = workers
+        self.maxAttempts = maxAttempts
+        self.baseDelaySeconds = baseDelaySeconds
+        self.maxDelaySeconds = maxDelaySeconds
+        self.onDeadChats = onDeadChats
+
+        self._dbWorker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='outbox-db')
+        self._connection: Optional[sqlite3.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeUp: Optional[asyncio.Event] = None
+        self._inFlight = set()
+        self._batches: Dict[str, _BatchProgress] = {}
+        self._batchIds = itertools.count(1)
+        self._tasks: List[asyncio.Task] = []
+        self._deadChatIds: List[int] = []
+        self._callbackTasks = set()
+
+    async def _db(self, func: Callable, *args):
+        """Run a database call on the outbox thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._dbWorker, func, *args)
+
+    def _open(self) -> None:
+        self._connection = sqlite3.connect(self.db_file_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+        self._connection.commit()
+
+    def _insert(self, rows: List[tuple]) -> None:
+        with self._connection as conn:
+            conn.executemany('INSERT INTO outbox (chat_id, message, next_attempt_at, batch_id) VALUES (?, ?, ?, ?)', rows)
+
+    def _fetchDue(self, now: float, limit: int, exclude: List[int]) -> List[OutboxMessage]:
+        placeholders = ','.join('?' * len(exclude))
+        query = 'SELECT id, chat_id, message, attempt, next_attempt_at, batch_id FROM outbox WHERE next_attempt_at <= ?'
+        if exclude:
+            query += f' AND id NOT IN ({placeholders})'
+        query += ' ORDER BY next_attempt_at LIMIT ?'
+        rows = self._connection.execute(query, (now, *exclude, limit)).fetchall()
+        return [OutboxMessage(*row) for row in rows]
+
+    def _nextDueAt(self) -> Optional[float]:
+        return self._connection.execute('SELECT MIN(next_attempt_at) FROM outbox').fetchone()[0]
+
+    def _delete(self, messageId: int) -> None:
+        with self._connection as conn:
+            conn.execute('DELETE FROM outbox WHERE id = ?', (messageId,))
+
+    def _reschedule(self, messageId: int, attempt: int, nextAttemptAt: float) -> None:
+        with self._connection as conn:
+            conn.execute('UPDATE outbox SET attempt = ?, next_attempt_at = ? WHERE id = ?', (attempt, nextAttemptAt, messageId))
+
+    def _count(self) -> int:
+        return self._connection.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    async def start(self) -> None:
+        """Open the outbox and start draining it, including messages left from a previous run"""
+        await self._db(self._open)
+        self._queue = asyncio.Queue(maxsize=self.workers * 2)
+        self._wakeUp = asyncio.Event()
+
+        pending = await self._db(self._count)
+        if pending:
+            styler.info(f"Resuming delivery of {pending} queued messages")
+
+        self._tasks = [asyncio.create_task(self._dispatch())]
+        self._tasks += [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._flushDeadChats()
+        await asyncio.gather(*self._callbackTasks, return_exceptions=True)
+        if self._connection:
+            await self._db(self._connection.close)
+            self._connection = None
+
+    async def enqueue(self, chatIds: List[int], message: str) -> str:
+        """
+        Queue a message for several chats with one write
+        
+        Returns:
+            str: Batch id, used in the delivery summary
+        """
+        batchId = f"{int(time.time())}-{next(self._batchIds)}"
+        now = time.time()
+        await self._db(self._insert, [(chatId, message, now, batchId) for chatId in chatIds])
+        self._batches[batchId] = _BatchProgress(message=message, total=len(chatIds), startedAt=time.monotonic())
+        self._wakeUp.set()
+        return batchId
+
+    async def _dispatch(self) -> None:
+        """Move due messages from the database to the workers"""
+        while True:
+            self._wakeUp.clear()
+            due = await self._db(self._fetchDue, time.time(), self.workers * 4, list(self._inFlight))
+            for item in due:
+                self._inFlight.add(item.id)
+                await self._queue.put(item)
+            if len(due) == self.workers * 4:
+                continue
+
+            if not self._inFlight:
+                # Dead chats of batches left over from a previous run
+                self._flushDeadChats()
+
+            nextDueAt = await self._db(self._nextDueAt)
+            timeout = None
+            if nextDueAt is not None:
+                # Messages still in flight also count, look again in a second at most
+                timeout = min(1.0, max(0.0, nextDueAt - time.time())) if self._inFlight else max(0.0, nextDueAt - time.time())
+            try:
+                await asyncio.wait_for(self._wakeUp.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _retryDelay(self, attempt: int) -> float:
+        delay = min(self.maxDelaySeconds, self.baseDelaySeconds * 2 ** (attempt - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _work(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(item)
+            except Exception as e:
+                styler.error(f"Outbox worker error: {e}")
+            finally:
+                self._inFlight.discard(item.id)
+                self._queue.task_done()
+
+    async def _deliver(self, item: OutboxMessage) -> None:
+        try:
+            await self.send(item.chat_id, item.message)
+        except Exception as e:
+            attempt = item.attempt + 1
+            if isPermanentSendError(e):
+                styler.error(f"Chat {item.chat_id} can no longer receive messages: {e}")
+                await self._db(self._delete, item.id)
+                self._deadChatIds.append(item.chat_id)
+                self._recordResult(item.batch_id, False)
+            elif attempt >= self.maxAttempts:
+                styler.error(f"Giving up on message to chat {item.chat_id} after {attempt} attempts: {e}")
+                await self._db(self._delete, item.id)
+                self._recordResult(item.batch_id, False)
+            else:
+                delay = self._retryDelay(attempt)
+                styler.warning(f"Failed to send message to chat {item.chat_id} (attempt {attempt}), retrying in {delay:.0f}s: {e}")
+                await self._db(self._reschedule, item.id, attempt, time.time() + delay)
+                self._wakeUp.set()
+            return
+
+        await self._db(self._delete, item.id)
+        self._recordResult(item.batch_id, True)
+
+    def _recordResult(self, batchId: str, sent: bool) -> None:
+        """Count a finished message and log the summary once its whole batch is done"""
+        batch = self._batches.get(batchId)
+        if batch is None:
+            return  # Batch from a previous run
+        if sent:
+            batch.sent += 1
+        else:
+            batch.failed += 1
+        if batch.sent + batch.failed == batch.total:
+            del self._batches[batchId]
+            broadcastDuration.observe(time.monotonic() - batch.startedAt)
+            styler.info(f"Message sent to {batch.sent}/{batch.total} chats: {batch.message}")
+            self._flushDeadChats()
+
+    def _flushDeadChats(self) -> None:
+        """Hand the collected dead chats over in one call"""
+        if not self._deadChatIds or not self.onDeadChats:
+            return
+        deadChatIds, self._deadChatIds = self._deadChatIds, []
+        task = asyncio.create_task(self.onDeadChats(deadChatIds))
+        self._callbackTasks.add(task)
+        task.add_done_callback(self._callbackTasks.discard)
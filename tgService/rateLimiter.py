@@ -0,0 +1,123 @@
+import asyncio
+import multiprocessing
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updatedAt = time.monotonic()
+        self._pausedUntil = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updatedAt) * self.rate)
+        self._updatedAt = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        # The lock keeps waiters in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._pausedUntil:
+                    await asyncio.sleep(self._pausedUntil - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds`"""
+        self._pausedUntil = max(self._pausedUntil, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class SharedTokenBucket:
+    """
+    Token bucket shared by several processes through shared memory
+
+    Same interface as TokenBucket. time.monotonic() is system-wide on Linux,
+    so all processes agree on the refill and pause times. Create it before
+    starting the worker processes and hand it to them as a process argument.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, context=None):
+        context = context or multiprocessing.get_context()
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        # tokens, updatedAt, pausedUntil
+        self._state = context.Array('d', [self.capacity, time.monotonic(), 0.0], lock=False)
+        self._lock = context.Lock()
+
+    def _tryTake(self) -> float:
+        """Take a token and return 0, or return how long to wait for one"""
+        with self._lock:
+            tokens, updatedAt, pausedUntil = self._state[:]
+            now = time.monotonic()
+            if now < pausedUntil:
+                return pausedUntil - now
+
+            tokens = min(self.capacity, tokens + (now - updatedAt) * self.rate)
+            if tokens >= 1:
+                self._state[:] = [tokens - 1, now, pausedUntil]
+                return 0.0
+            self._state[:] = [tokens, now, pausedUntil]
+            return (1 - tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        while True:
+            delay = self._tryTake()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds`, in every process"""
+        with self._lock:
+            self._state[0] = 0
+            self._state[2] = max(self._state[2], time.monotonic() + seconds)
+
+
+class BroadcastRateLimiter:
+    """
+    Keeps sends within Telegram's limits: a global messages-per-second budget
+    shared by all chats plus a minimum interval between messages to one chat.
+    Pass a SharedTokenBucket as `globalBucket` to share the budget between processes.
+    """
+
+    def __init__(self, globalRate: float = 25, perChatRate: float = 1, maxTrackedChats: int = 10000, globalBucket=None):
+        self.globalBucket = globalBucket or TokenBucket(globalRate)
+        self._perChatInterval = 1 / perChatRate
+        self._maxTrackedChats = maxTrackedChats
+        self._chatNextSendAt: Dict[int, float] = {}
+
+    def _reserveChatSlot(self, chatId: int) -> float:
+        """Reserve the next send slot of a chat and return how long to wait for it"""
+        now = time.monotonic()
+        if len(self._chatNextSendAt) >= self._maxTrackedChats:
+            self._chatNextSendAt = {cid: at for cid, at in self._chatNextSendAt.items() if at > now}
+
+        sendAt = max(now, self._chatNextSendAt.get(chatId, 0.0))
+        self._chatNextSendAt[chatId] = sendAt + self._perChatInterval
+        return sendAt - now
+
+    async def acquire(self, chatId: int) -> None:
+        """Wait until a message may be sent to `chatId`"""
+        delay = self._reserveChatSlot(chatId)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.globalBucket.acquire()
+
+    def backoff(self, seconds: float) -> None:
+        """Stop all sends for `seconds`, e.g. after a 429 response"""
+        self.globalBucket.pause(seconds)
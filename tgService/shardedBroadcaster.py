@@ -0,0 +1,116 @@
+import asyncio
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from utils import styler
+from .rateLimiter import BroadcastRateLimiter, SharedTokenBucket
+
+# Worker process state, set by _initWorker and kept for the life of the
+# process: per-chat pacing and Bot API connections carry over between broadcasts
+_rateLimiter: Optional[BroadcastRateLimiter] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker = None
+_workerReady = False
+
+
+def _initWorker(token: str, bucket: SharedTokenBucket, perChatRate: float) -> None:
+    global _rateLimiter, _loop, _worker
+    # Imported here, the parent process imports this module from tgService.py
+    from .tgService import TgService, buildApplication
+
+    _rateLimiter = BroadcastRateLimiter(perChatRate=perChatRate, globalBucket=bucket)
+    _loop = asyncio.new_event_loop()
+    _worker = TgService()
+    _worker._tgApp = buildApplication(token)
+    _worker._rateLimiter = _rateLimiter
+    atexit.register(_closeWorker)
+
+
+def _closeWorker() -> None:
+    if _workerReady:
+        _loop.run_until_complete(_worker._tgApp.shutdown())
+    _loop.close()
+
+
+def _sendShard(chatIds: List[int], message: str, concurrency: int) -> Tuple[int, List[int]]:
+    """Runs in a worker process: send to one shard and return (sent count, dead chat IDs)"""
+    return _loop.run_until_complete(_sendShardAsync(chatIds, message, concurrency))
+
+
+async def _sendShardAsync(chatIds: List[int], message: str, concurrency: int) -> Tuple[int, List[int]]:
+    global _workerReady
+    # Initialized by the first broadcast, it calls the Bot API; a failure is retried by the next one
+    if not _workerReady:
+        await _worker._tgApp.initialize()
+        _workerReady = True
+
+    semaphore = asyncio.Semaphore(concurrency)
+    deadChatIds = []
+    results = await asyncio.gather(*(_worker._broadcastToChat(cid, message, semaphore, deadChatIds) for cid in chatIds))
+    return sum(results), deadChatIds
+
+
+class ShardedBroadcaster:
+    """
+    Splits a broadcast across worker processes, so JSON encoding, TLS and
+    bookkeeping of big broadcasts use more than one core.
+
+    Chats are sharded by chat ID hash and every shard always goes to the same
+    single-process executor, which keeps the per-chat pacing of a chat in one
+    process. All workers take tokens from `globalBucket`, and a 429 in any
+    worker pauses them all; the parent process should send through it too.
+
+    Args:
+        token: Bot token, every worker opens its own Bot API connections
+        processes: Number of worker processes
+        globalRate: Messages per second of all processes together
+        perChatRate: Messages per second to one chat
+        concurrency: Sends in flight per worker
+    """
+
+    def __init__(self, token: str, processes: int, globalRate: float = 25, perChatRate: float = 1, concurrency: int = 20):
+        self._concurrency = concurrency
+        # Workers must not inherit the parent's event loop and threads
+        context = multiprocessing.get_context('spawn')
+        self.globalBucket = SharedTokenBucket(globalRate, context=context)
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_initWorker,
+                                initargs=(token, self.globalBucket, perChatRate))
+            for _ in range(processes)
+        ]
+
+    def shard(self, chatIds: List[int]) -> List[List[int]]:
+        shards = [[] for _ in self._executors]
+        for chatId in chatIds:
+            shards[hash(chatId) % len(shards)].append(chatId)
+        return shards
+
+    async def broadcast(self, chatIds: List[int], message: str) -> Tuple[int, List[int]]:
+        """
+        Send `message` to all `chatIds` from the worker processes
+
+        Returns:
+            Tuple[int, List[int]]: Number of chats reached and chats that can never be reached again
+        """
+        loop = asyncio.get_running_loop()
+        jobs = [
+            (shard, loop.run_in_executor(executor, _sendShard, shard, message, self._concurrency))
+            for executor, shard in zip(self._executors, self.shard(chatIds)) if shard
+        ]
+        results = await asyncio.gather(*(future for _, future in jobs), return_exceptions=True)
+
+        successCount = 0
+        deadChatIds = []
+        for (shard, _), result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                styler.error(f"Broadcast worker failed, {len(shard)} chats not reached: {result}")
+                continue
+            sent, dead = result
+            successCount += sent
+            deadChatIds.extend(dead)
+        return successCount, deadChatIds
+
+    def close(self) -> None:
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
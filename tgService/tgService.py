@@ -1,23 +1,97 @@
 import logging
 import asyncio
+import json
+import secrets
+import time
+from datetime import timedelta
+from typing import Optional
 from telegram import ForceReply, Update
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+from config import config
 from utils import styler
-from storage import storageService
+from utils.httpServer import HttpServer, HttpRequest, HttpResponse
+from utils.metrics import broadcastDuration, sendDuration, sendErrors
+from utils.startupTimer import startupTimer
+from storage import getAsyncStorageService, getSubscriptionService, ALL_LOCATIONS
+from state import getHistoryService, getStateService
+from svitloService import svitloService
+from .rateLimiter import BroadcastRateLimiter
+from .shardedBroadcaster import ShardedBroadcaster
+from .outbox import NotificationOutbox
+from .errors import isPermanentSendError
 
 class TgService:
     _tgApp = None
+    _rateLimiter: Optional[BroadcastRateLimiter] = None
+    _webhookSecret: str = ''
+    _outbox: Optional[NotificationOutbox] = None
+    _broadcaster: Optional[ShardedBroadcaster] = None
+
+    def __init__(self):
+        self._ready = asyncio.Event()
 
     async def initBot(self, token: str) -> None:
         styler.info("Starting Telegram bot...")
-        self._tgApp = Application.builder().token(token).build()
+        application = buildApplication(token)
+        globalRate = config.get('broadcast-messages-per-second', 25)
+        perChatRate = config.get('chat-messages-per-second', 1)
+        processes = config.get('broadcast-processes', 0)
+        if processes:
+            self._broadcaster = ShardedBroadcaster(
+                token,
+                processes,
+                globalRate=globalRate,
+                perChatRate=perChatRate,
+                concurrency=config.get('broadcast-concurrency', 20)
+            )
+        # Worker processes and this one draw from the same budget
+        self._rateLimiter = BroadcastRateLimiter(
+            globalRate=globalRate,
+            perChatRate=perChatRate,
+            globalBucket=self._broadcaster.globalBucket if self._broadcaster else None
+        )
 
         # on different commands - answer in Telegram
-        self._tgApp.add_handler(CommandHandler("start", self.commandStart))
+        application.add_handler(CommandHandler("start", self.commandStart))
+        application.add_handler(CommandHandler("history", self.commandHistory))
+        application.add_handler(CommandHandler("status", self.commandStatus))
+        application.add_handler(CommandHandler("check", self.commandCheck))
+        application.add_handler(CommandHandler("stats", self.commandStats))
+        application.add_handler(CommandHandler("subscribe", self.commandSubscribe))
+        application.add_handler(CommandHandler("unsubscribe", self.commandUnsubscribe))
         
         # Initialize the application
-        await self._tgApp.initialize()
+        await application.initialize()
+        # Load the subscriptions from disk here, not on the loop during the first broadcast
+        await asyncio.to_thread(getSubscriptionService)
+        # Published only once usable, sendCustomMessage waits for it
+        self._tgApp = application
+
+        if config.get('outbox-enabled', False):
+            self._outbox = NotificationOutbox(
+                self._sendToChat,
+                onDeadChats=self._deactivateDeadChats,
+                db_file_path=config.get('outbox-path'),
+                workers=config.get('broadcast-concurrency', 20),
+                maxAttempts=config.get('outbox-max-attempts', 5),
+                baseDelaySeconds=config.get('outbox-retry-delay-seconds', 2),
+                maxDelaySeconds=config.get('outbox-max-retry-delay-seconds', 600)
+            )
+            await self._outbox.start()
+        self._ready.set()
+        startupTimer.mark('bot ready')
         styler.info("Telegram bot initialized.")
+
+    async def _shutdown(self) -> None:
+        if self._outbox:
+            await self._outbox.stop()
+        if self._broadcaster:
+            self._broadcaster.close()
+        await self._tgApp.stop()
+        if self._tgApp.updater.running:
+            await self._tgApp.updater.stop()
+        await self._tgApp.shutdown()
     
     async def startPolling(self, token) -> None:
         """Start the bot polling"""
@@ -33,65 +107,374 @@ class TgService:
             # Keep the bot running
             await asyncio.Event().wait()
         finally:
-            await self._tgApp.stop()
-            await self._tgApp.updater.stop()
-            await self._tgApp.shutdown()
+            await self._shutdown()
+
+    async def startWebhook(self, token) -> None:
+        """
+        Receive updates through a webhook served by a local HTTP listener
+        
+        Telegram POSTs updates to `webhook-url` + `webhook-path`; requests without
+        the matching secret token header are rejected. Updates go straight into
+        the application's update queue.
+        """
+        if not self._tgApp:
+            await self.initBot(token)
+
+        path = config.get('webhook-path', '/telegram')
+        self._webhookSecret = config.get('webhook-secret') or secrets.token_urlsafe(32)
+        server = HttpServer(config.get('webhook-listen', '0.0.0.0'), config.get('webhook-port', 8443))
+        server.route('POST', path, self._handleWebhookRequest)
+
+        styler.info("Starting Telegram bot webhook...")
+        await server.start()
+        await self._tgApp.start()
+
+        webhookUrl = config.get('webhook-url')
+        if webhookUrl:
+            await self._tgApp.bot.set_webhook(
+                url=webhookUrl.rstrip('/') + path,
+                secret_token=self._webhookSecret,
+                allowed_updates=Update.ALL_TYPES
+            )
+            styler.info(f"Webhook registered at {webhookUrl.rstrip('/') + path}")
+        else:
+            styler.warning("webhook-url is not set, the webhook is not registered with Telegram")
+
+        try:
+            # Keep the bot running
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+            await self._shutdown()
+
+    async def _handleWebhookRequest(self, request: HttpRequest) -> HttpResponse:
+        """Verify a webhook request and queue its update for the application"""
+        if not secrets.compare_digest(request.headers.get('x-telegram-bot-api-secret-token', ''), self._webhookSecret):
+            styler.warning("Rejected webhook request with a wrong secret token")
+            return HttpResponse(status=403)
+
+        try:
+            update = Update.de_json(json.loads(request.body), self._tgApp.bot)
+        except ValueError as e:
+            styler.error(f"Invalid webhook update: {e}")
+            return HttpResponse(status=400)
+
+        await self._tgApp.update_queue.put(update)
+        return HttpResponse(status=200)
 
     async def commandStart(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Send a message when the command /start is issued."""
         styler.info("Received /start command")
         # Store the chat ID for future messaging
-        storageService.saveChat(update.effective_chat.id, update.effective_user.username, update.effective_user.first_name, update.effective_user.last_name)  # Store chat ID in storage service
+        await getAsyncStorageService().saveChat(update.effective_chat.id, update.effective_user.username, update.effective_user.first_name, update.effective_user.last_name)  # Store chat ID in storage service
+        # New chats hear about every location until they /subscribe to some
+        await asyncio.to_thread(getSubscriptionService().subscribeDefault, update.effective_chat.id)
         user = update.effective_user
         await update.message.reply_html(rf"Hi {user.first_name}!")
 
-    async def sendCustomMessage(self, message: str, chat_id: int = None) -> bool:
+    async def commandHistory(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Report outages of the last N days (7 by default) when /history [days] is issued."""
+        styler.info("Received /history command")
+        try:
+            days = float(context.args[0]) if context.args else 7
+        except ValueError:
+            days = None
+        # Also rejects nan and inf, which timedelta cannot take
+        if days is None or not 0 < days <= 3650:
+            await update.message.reply_text("Usage: /history [days]")
+            return
+
+        summaries = await asyncio.to_thread(
+            lambda: [getHistoryService().getOutageSummary(target, days) for target in getHistoryService().getTargets()]
+        )
+        if not summaries:
+            await update.message.reply_text("No history recorded yet.")
+            return
+
+        lines = [f"Outages in the last {days:g} days:"]
+        for summary in summaries:
+            lines.append(
+                f"{summary['target']}: {summary['outages']} outages, "
+                f"total {_formatDuration(summary['totalDowntime'])}, "
+                f"longest {_formatDuration(summary['longestOutage'])}"
+            )
+        await update.message.reply_text("\n".join(lines))
+
+    async def commandStats(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Report uptime for today and the last 7 days and outages by hour of day when /stats is issued."""
+        styler.info("Received /stats command")
+        stats = await asyncio.to_thread(_collectStats)
+        if not stats:
+            await update.message.reply_text("No history recorded yet.")
+            return
+
+        lines = []
+        for daily, weekly in stats:
+            lines.append(f"{weekly['target']}:")
+            lines.append(f"Today: {_formatStats(daily)}")
+            lines.append(f"7 days: {_formatStats(weekly)}")
+            lines.append(f"Outages by hour 0-23: {_formatHeatmap(weekly['heatmap'])}")
+        await update.message.reply_text("\n".join(lines))
+
+    def _findLocation(self, name: str) -> Optional[str]:
+        """Target name matching `name` ignoring case, ALL_LOCATIONS for 'all'"""
+        if name.lower() == 'all':
+            return ALL_LOCATIONS
+        for target in svitloService.getTargets():
+            if target.name.lower() == name.lower():
+                return target.name
+        return None
+
+    def _describeSubscriptions(self, chat_id: int) -> str:
+        locations = getSubscriptionService().getLocations(chat_id)
+        if ALL_LOCATIONS in locations:
+            current = "all locations"
+        else:
+            current = ", ".join(sorted(locations)) or "nothing"
+        available = ", ".join(target.name for target in svitloService.getTargets())
+        return f"You are subscribed to {current}.\nLocations: {available}"
+
+    async def commandSubscribe(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Subscribe the chat to a location, or to all with 'all', when /subscribe [location] is issued."""
+        styler.info("Received /subscribe command")
+        chat_id = update.effective_chat.id
+        if not context.args:
+            await update.message.reply_text(self._describeSubscriptions(chat_id) + "\nUsage: /subscribe <location|all>")
+            return
+
+        location = self._findLocation(" ".join(context.args))
+        if location is None:
+            await update.message.reply_text("Unknown location.\n" + self._describeSubscriptions(chat_id))
+            return
+
+        await asyncio.to_thread(getSubscriptionService().subscribe, chat_id, location)
+        await update.message.reply_text(self._describeSubscriptions(chat_id))
+
+    async def commandUnsubscribe(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Unsubscribe the chat from a location, or from everything without arguments, when /unsubscribe [location] is issued."""
+        styler.info("Received /unsubscribe command")
+        chat_id = update.effective_chat.id
+        location = self._findLocation(" ".join(context.args)) if context.args else None
+        if context.args and location is None:
+            await update.message.reply_text("Unknown location.\n" + self._describeSubscriptions(chat_id))
+            return
+
+        await asyncio.to_thread(getSubscriptionService().unsubscribe, chat_id, location)
+        await update.message.reply_text(self._describeSubscriptions(chat_id))
+
+    def _selectTargets(self, args: list) -> list:
+        """Targets named in the command arguments, all targets if none are named"""
+        targets = svitloService.getTargets()
+        if not args:
+            return targets
+        # Matched like /subscribe matches locations: ignoring case, 'all' for every target
+        location = self._findLocation(" ".join(args))
+        if location == ALL_LOCATIONS:
+            return targets
+        return [target for target in targets if target.name == location]
+
+    async def _replyStatus(self, update: Update, targets: list) -> None:
+        lines = [_formatStatus(getStateService().getStatus(target.name), showName=len(targets) > 1) for target in targets]
+        await update.message.reply_text("\n".join(lines))
+
+    async def commandStatus(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Report the current state when /status [target] is issued, probing only targets whose state is stale."""
+        styler.info("Received /status command")
+        targets = self._selectTargets(context.args)
+        if not targets:
+            await update.message.reply_text("Unknown target. Usage: /status [target]")
+            return
+
+        maxAge = config.get('status-max-age-seconds', 2 * config.get('timeinterval-to-check', 30))
+        stale = [target for target in targets if (getStateService().getCheckAge(target.name) or float('inf')) > maxAge]
+        if stale:
+            await asyncio.gather(*(svitloService.checkTargetNow(target) for target in stale))
+        await self._replyStatus(update, targets)
+
+    async def commandCheck(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Probe the target(s) now when /check [target] is issued and report the result."""
+        styler.info("Received /check command")
+        targets = self._selectTargets(context.args)
+        if not targets:
+            await update.message.reply_text("Unknown target. Usage: /check [target]")
+            return
+
+        await asyncio.gather(*(svitloService.checkTargetNow(target) for target in targets))
+        await self._replyStatus(update, targets)
+
+    async def sendCustomMessage(self, message: str, chat_id: int = None, location: str = None) -> bool:
         """
         Send a custom message to bot chat(s).
         
         Args:
             message (str): The message to send
             chat_id (int, optional): Specific chat ID to send to. If None, sends to all known chats.
+            location (str, optional): Only send to chats subscribed to this location.
         
         Returns:
             bool: True if message was sent successfully, False otherwise
         """
         styler.printSeparator()
 
-        if not self._tgApp:
+        if not await self._waitUntilReady(config.get('bot-ready-timeout-seconds', 30)):
             styler.error("Bot is not initialized!")
             return False
         
         try:
             if chat_id:
                 # Send to specific chat
-                await self._tgApp.bot.send_message(chat_id=chat_id, text=message)
+                await self._sendToChat(chat_id, message)
                 return True
 
             
-            chatIdArray = storageService.getAllChatIds()
+            if location is not None:
+                # Looked up in the subscription index, other chats are never visited
+                chatIdArray = await asyncio.to_thread(lambda: getSubscriptionService().getSubscribers(location))
+                # Storage decides who is still reachable, a deactivated or deleted chat may still be subscribed
+                chatIdArray = await getAsyncStorageService().filterActiveChatIds(chatIdArray)
+                if not chatIdArray:
+                    styler.info(f"No chats subscribed to {location}")
+                    return False
+            else:
+                chatIdArray = await getAsyncStorageService().getAllChatIds()
 
             # Send to all known chats
             if not chatIdArray:
                 styler.error("No chat IDs available. Users need to interact with the bot first.")
                 return False
             
-            success_count = 0
-            for cid in chatIdArray.copy():  # Use copy to avoid modification during iteration
-                try:
-                    await self._tgApp.bot.send_message(chat_id=cid, text=message)
-                    success_count += 1
-                except Exception as e:
-                    styler.error(f"Failed to send message to chat {cid}: {e}")
-                    # Optionally remove invalid chat IDs
-                    # self._chat_ids.discard(cid)
+            if self._outbox:
+                # Delivered and retried by the outbox workers, which log the summary
+                await self._outbox.enqueue(chatIdArray, message)
+                styler.info(f"Message queued for {len(chatIdArray)} chats: {message}")
+                return True
+            
+            with broadcastDuration.time():
+                if self._broadcaster:
+                    success_count, deadChatIds = await self._broadcaster.broadcast(chatIdArray, message)
+                else:
+                    semaphore = asyncio.Semaphore(config.get('broadcast-concurrency', 20))
+                    deadChatIds = []
+                    results = await asyncio.gather(*(self._broadcastToChat(cid, message, semaphore, deadChatIds) for cid in chatIdArray))
+                    success_count = sum(results)
             
             styler.info(f"Message sent to {success_count}/{len(chatIdArray)} chats: {message}")
+            await self._deactivateDeadChats(deadChatIds)
             return success_count > 0
                 
         except Exception as e:
             styler.error(f"Error sending message: {e}")
             return False
 
+    async def _waitUntilReady(self, timeoutSeconds: float) -> bool:
+        """Wait for initBot, which may still be running when the first probes report"""
+        if self._tgApp:
+            return True
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeoutSeconds)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _broadcastToChat(self, chat_id: int, message: str, semaphore: asyncio.Semaphore, deadChatIds: list) -> bool:
+        """
+        Send one message of a broadcast, at most `semaphore` sends in flight.
+        Chats that can never be reached again are added to `deadChatIds`.
+        """
+        async with semaphore:
+            try:
+                await self._sendToChat(chat_id, message)
+                return True
+            except Exception as e:
+                styler.error(f"Failed to send message to chat {chat_id}: {e}")
+                if isPermanentSendError(e):
+                    deadChatIds.append(chat_id)
+                return False
+
+    async def _deactivateDeadChats(self, chatIds: list) -> None:
+        """Deactivate chats that blocked the bot or were deleted, with one storage write"""
+        if not chatIds:
+            return
+        count = await getAsyncStorageService().deactivate_chat_ids(chatIds)
+        await asyncio.to_thread(getSubscriptionService().removeChats, chatIds)
+        styler.warning(f"Deactivated {count} chats that can no longer receive messages")
+
+    async def _sendToChat(self, chat_id: int, message: str) -> None:
+        """
+        Send a message within the rate limits, waiting out 429 responses
+
+        Raises:
+            TelegramError: If sending failed or was still rate limited after all retries
+        """
+        maxRetries = config.get('broadcast-max-retries', 3)
+
+        for attempt in range(maxRetries + 1):
+            await self._rateLimiter.acquire(chat_id)
+            startTime = time.perf_counter()
+            try:
+                await self._tgApp.bot.send_message(chat_id=chat_id, text=message)
+                sendDuration.observe(time.perf_counter() - startTime)
+                return
+            except Exception as e:
+                sendDuration.observe(time.perf_counter() - startTime)
+                sendErrors.inc(type=type(e).__name__)
+                if not isinstance(e, RetryAfter) or attempt == maxRetries:
+                    raise
+                retryAfter = e.retry_after
+                if isinstance(retryAfter, timedelta):
+                    retryAfter = retryAfter.total_seconds()
+                styler.warning(f"Flood control hit, pausing sends for {retryAfter}s")
+                self._rateLimiter.backoff(retryAfter)
+
+
+def buildApplication(token: str) -> Application:
+    # Handle updates concurrently, so a crowd of /check requests joins one probe instead of queueing
+    builder = Application.builder().token(token).concurrent_updates(True)
+    baseUrl = config.get('telegram-api-base-url')
+    if baseUrl:
+        # A local Bot API server or a stand-in for load testing
+        builder = builder.base_url(baseUrl)
+    return builder.build()
+
+
+def _collectStats() -> list:
+    """(today, last 7 days) statistics of every target; blocking, NumPy is loaded on first use"""
+    from state import getStatsService
+    statsService = getStatsService()
+    return [(statsService.getStats(target, 1), statsService.getStats(target, 7)) for target in statsService.getTargets()]
+
+
+def _formatStatus(status: dict, showName: bool) -> str:
+    line = f"{status['icon']} {status['target']} - {status['text']}" if showName else f"{status['icon']} - {status['text']}"
+    if status['lastUpdateTime'] and status['isOn'] is not None:
+        line += f" since {status['lastUpdateTime'].strftime('%d.%m %H:%M')}"
+    if status['lastCheckTime']:
+        line += f", checked at {status['lastCheckTime'].strftime('%H:%M:%S')}"
+    return line
+
+
+def _formatStats(stats: dict) -> str:
+    uptime = f"{stats['uptimePercent']:.1f}%" if stats['uptimePercent'] is not None else "n/a"
+    text = f"{uptime} uptime, {stats['outages']} outages"
+    if stats['meanOutage']:
+        # Mean of finished outages, an ongoing one only counts for the longest
+        text += f", mean {_formatDuration(stats['meanOutage'])}"
+    if stats['outages']:
+        text += f", longest {_formatDuration(stats['longestOutage'])}"
+    return text
+
+
+def _formatHeatmap(heatmap: list) -> str:
+    """One block per hour, taller for hours more often without power"""
+    blocks = "▁▂▃▄▅▆▇█"
+    peak = max(heatmap) or 1
+    return "".join(blocks[min(len(blocks) - 1, int(value / peak * len(blocks)))] if value else "·" for value in heatmap)
+
+
+def _formatDuration(duration: timedelta) -> str:
+    minutes = int(duration.total_seconds() // 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m"
+
 
 tgService = TgService()
@@ -0,0 +1,144 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from .printStyler import styler
+
+STATUS_TEXTS = {
+    200: 'OK',
+    400: 'Bad Request',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    429: 'Too Many Requests',
+    500: 'Internal Server Error',
+}
+
+
+@dataclass
+class HttpRequest:
+    method: str
+    path: str
+    query: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+@dataclass
+class HttpResponse:
+    status: int = 200
+    body: bytes = b''
+    contentType: str = 'text/plain; charset=utf-8'
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+Handler = Callable[[HttpRequest], Awaitable[HttpResponse]]
+
+
+class HttpServer:
+    """
+    Minimal asyncio HTTP/1.1 server for the few local endpoints the bot
+    exposes. Supports keep-alive and requests with a Content-Length body.
+    """
+
+    def __init__(self, host: str, port: int, maxBodyBytes: int = 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.maxBodyBytes = maxBodyBytes
+        self._routes: Dict[Tuple[str, str], Handler] = {}
+        self._fallback: Optional[Handler] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Open connections: writer -> handler task
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        self._routes[(method.upper(), path)] = handler
+
+    def fallback(self, handler: Handler) -> None:
+        """Handle requests that match no route, e.g. paths with parameters"""
+        self._fallback = handler
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handleConnection, self.host, self.port)
+        # Port 0 means "any free port"
+        self.port = self._server.sockets[0].getsockname()[1]
+        styler.info(f"HTTP server listening on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            # Idle keep-alive connections would otherwise hold wait_closed()
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _readRequest(self, reader: asyncio.StreamReader) -> Optional[HttpRequest]:
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            return None
+
+        lines = head.decode('latin-1').split('\r\n')
+        method, target, _ = lines[0].split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > self.maxBodyBytes:
+            raise ValueError('Payload too large')
+        body = await reader.readexactly(length) if length else b''
+
+        path, _, query = target.partition('?')
+        return HttpRequest(method=method.upper(), path=path, query=query, headers=headers, body=body)
+
+    async def _dispatch(self, request: HttpRequest) -> HttpResponse:
+        handler = self._routes.get((request.method, request.path)) or self._fallback
+        if handler is None:
+            allowed = any(path == request.path for _, path in self._routes)
+            return HttpResponse(status=405 if allowed else 404)
+        try:
+            return await handler(request)
+        except Exception as e:
+            styler.error(f"Error handling {request.method} {request.path}: {e}")
+            return HttpResponse(status=500)
+
+    @staticmethod
+    def _writeResponse(writer: asyncio.StreamWriter, response: HttpResponse, keepAlive: bool) -> None:
+        headers = {
+            'Content-Type': response.contentType,
+            'Content-Length': str(len(response.body)),
+            'Connection': 'keep-alive' if keepAlive else 'close',
+            **response.headers
+        }
+        head = f"HTTP/1.1 {response.status} {STATUS_TEXTS.get(response.status, '')}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + response.body)
+
+    async def _handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    request = await self._readRequest(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    self._writeResponse(writer, HttpResponse(status=400), keepAlive=False)
+                    break
+                if request is None:
+                    break
+
+                response = await self._dispatch(request)
+                keepAlive = request.headers.get('connection', '').lower() != 'close'
+                self._writeResponse(writer, response, keepAlive)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
@@ -0,0 +1,155 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple
+from .httpServer import HttpServer, HttpRequest, HttpResponse
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatLabels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Metric:
+    type = ''
+
+    def __init__(self, name: str, help: str, labelNames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelNames = tuple(labelNames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelNames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labelNames: Sequence[str] = ()):
+        super().__init__(name, help, labelNames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_formatLabels(self.labelNames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelNames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelNames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        if key not in self._values:
+            self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = self._values[key]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the `with` block took"""
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - startTime, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                bucketLabel = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_formatLabels(self.labelNames, key, bucketLabel)} {cumulative}")
+            lines.append(f"{self.name}_sum{_formatLabels(self.labelNames, key)} {total[0]}")
+            lines.append(f"{self.name}_count{_formatLabels(self.labelNames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process metrics and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Awaitable[None]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelNames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelNames))
+
+    def gauge(self, name: str, help: str, labelNames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelNames))
+
+    def histogram(self, name: str, help: str, labelNames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelNames, buckets))
+
+    def addCollector(self, collector: Callable[[], Awaitable[None]]) -> None:
+        """Register a coroutine that refreshes gauges right before every scrape"""
+        self._collectors.append(collector)
+
+    async def collect(self) -> str:
+        for collector in self._collectors:
+            await collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    async def _handleScrape(self, request: HttpRequest) -> HttpResponse:
+        body = await self.collect()
+        return HttpResponse(body=body.encode('utf-8'), contentType='text/plain; version=0.0.4; charset=utf-8')
+
+    async def serve(self, host: str, port: int) -> HttpServer:
+        """Expose the metrics at http://host:port/metrics"""
+        server = HttpServer(host, port)
+        server.route('GET', '/metrics', self._handleScrape)
+        await server.start()
+        return server
+
+
+metrics = MetricsRegistry()
+
+probeDuration = metrics.histogram('svitlo_probe_duration_seconds', 'Time to decide if a target is reachable', ['target'])
+probeResults = metrics.counter('svitlo_probe_results_total', 'Probe results', ['target', 'result'])
+tickLag = metrics.histogram('svitlo_tick_lag_seconds', 'Delay between the scheduled and the actual start of a probe',
+                            buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30))
+broadcastDuration = metrics.histogram('svitlo_broadcast_duration_seconds', 'Time to send a message to all chats',
+                                      buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+sendDuration = metrics.histogram('svitlo_send_duration_seconds', 'Latency of a single send_message call')
+sendErrors = metrics.counter('svitlo_send_errors_total', 'Failed send_message calls by error type', ['type'])
+storageOperationDuration = metrics.histogram('svitlo_storage_operation_seconds', 'Duration of storage operations', ['operation'])
+subscribers = metrics.gauge('svitlo_subscribers', 'Number of subscribed chats', ['state'])
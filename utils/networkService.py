@@ -1,33 +1,82 @@
 import asyncio
-from config import config
+import time
+from typing import Dict, Optional
+from config import config, Target
 from utils import styler
+from .probeBackends import ProbeBackend, createProbeBackend
+from .metrics import probeDuration, probeResults
 
 class NetworkService:
-    async def ping(self, ipAddress: str) -> bool:
+    def __init__(self):
+        self._backend: Optional[ProbeBackend] = None
+        # Probes running per backend, a replaced backend is closed once it has none
+        self._inFlight: Dict[ProbeBackend, int] = {}
+        self._retired: set = set()
+
+    def getBackend(self) -> ProbeBackend:
+        """Get the probe backend selected by the `probe-backend` config option"""
+        if self._backend is None:
+            self._backend = self._createBackend()
+        return self._backend
+
+    def _createBackend(self) -> ProbeBackend:
+        backend = createProbeBackend(
+            config.get('probe-backend', 'auto'),
+            config.get('tcp-probe-ports')
+        )
+        styler.info(f"Using {backend.name} probe backend")
+        return backend
+
+    def resetBackend(self) -> None:
+        """
+        Switch to a backend created from the current config. The old one keeps
+        serving the probes already running on it and is closed after them.
         """
-        Ping an IP address to check if it's reachable.
+        oldBackend, self._backend = self._backend, self._createBackend()
+        if oldBackend is not None:
+            self._retired.add(oldBackend)
+            self._closeIfIdle(oldBackend)
+
+    def _closeIfIdle(self, backend: ProbeBackend) -> None:
+        if backend in self._retired and not self._inFlight.get(backend):
+            self._retired.discard(backend)
+            self._inFlight.pop(backend, None)
+            backend.close()
+
+    async def ping(self, target: Target) -> bool:
         """
-        styler.ping(f'Pinging {ipAddress}...')
-        packetsQuantity = config.get('svitlo', {}).get('number-of-packets', 4)
+        Ping a target to check if it's reachable. Metrics are labelled by the
+        target name, addresses stay out of /metrics.
+        """
+        ipAddress = target.address
+        styler.ping(f'Pinging {target.name} ({ipAddress})...')
+        packetsQuantity = config.get('number-of-packets', 4)
+        timeout = config.get('probe-timeout', 3)
+        earlyExit = config.get('probe-early-exit', True)
         
+        backend: Optional[ProbeBackend] = None
         try:
-            result = await asyncio.create_subprocess_exec(
-                'ping', '-c', str(packetsQuantity), '-W', '3', ipAddress,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            await result.communicate()
-            isReachable = result.returncode == 0
+            backend = self.getBackend()
+            self._inFlight[backend] = self._inFlight.get(backend, 0) + 1
+            startTime = time.perf_counter()
+            isReachable = await backend.probe(ipAddress, packetsQuantity, timeout, earlyExit)
+            probeDuration.observe(time.perf_counter() - startTime, target=target.name)
+            probeResults.inc(target=target.name, result='reachable' if isReachable else 'unreachable')
 
             if isReachable:
-                styler.success(f'{ipAddress} is reachable.')
+                styler.success(f'{target.name} is reachable.')
             else:
-                styler.error(f'{ipAddress} is not reachable.')
+                styler.error(f'{target.name} is not reachable.')
             
             return isReachable
             
         except Exception as e:
+            probeResults.inc(target=target.name, result='error')
+            styler.error(f'Failed to ping {target.name} ({ipAddress}): {e}')
             return False
+        finally:
+            if backend is not None:
+                self._inFlight[backend] -= 1
+                self._closeIfIdle(backend)
         
 networkService = NetworkService()
@@ -1,5 +1,11 @@
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional
 
 
 class Colors:
@@ -32,6 +38,15 @@ class Icons:
     CROSS = '✗'
 
 
+LEVELS = {
+    'DEBUG': 10,
+    'INFO': 20,
+    'SUCCESS': 25,
+    'WARNING': 30,
+    'ERROR': 40
+}
+
+
 class PrintStyler:
     """Utility service for styled console output with colors and icons"""
     
@@ -45,6 +60,102 @@ class PrintStyler:
         """
         self.enableColors = enableColors
         self.enableIcons = enableIcons
+        self.minLevel = LEVELS['DEBUG']
+        self.jsonOutput = False
+        self.stream = None
+        self.droppedCount = 0
+        # Loggers on several threads may hit a full queue at once
+        self._droppedLock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._writerThread: Optional[threading.Thread] = None
+    
+    def configure(self, mode: str = 'sync', level: str = 'DEBUG', outputFormat: str = 'text', maxQueueSize: int = 10000, stream=None) -> None:
+        """
+        Configure how messages are written
+        
+        Args:
+            mode (str): 'sync' prints on the calling thread, 'queue' hands messages to a
+                background writer thread so a slow stdout never blocks the caller
+            level (str): Minimum level to write: DEBUG, INFO, SUCCESS, WARNING or ERROR
+            outputFormat (str): 'text' for styled lines, 'json' for one JSON object per line
+            maxQueueSize (int): Messages waiting for the writer; newer ones are dropped when full
+            stream: File object to write to, sys.stdout by default
+        """
+        if level.upper() not in LEVELS:
+            raise ValueError(f"Unknown log level: {level}")
+        if mode not in ('sync', 'queue'):
+            raise ValueError(f"Unknown log mode: {mode}")
+        
+        self.flush()
+        self.minLevel = LEVELS[level.upper()]
+        self.jsonOutput = outputFormat == 'json'
+        self.stream = stream
+        
+        if mode == 'queue' and self._queue is None:
+            self._queue = queue.Queue(maxsize=maxQueueSize)
+            self._writerThread = threading.Thread(target=self._writeQueued, name='styler-writer', daemon=True)
+            self._writerThread.start()
+            atexit.register(self.flush)
+        elif mode == 'sync' and self._queue is not None:
+            self._queue.put(None)
+            self._writerThread.join()
+            self._queue = None
+            self._writerThread = None
+    
+    def flush(self) -> None:
+        """Wait until every queued message is written"""
+        if self._queue is not None:
+            self._queue.join()
+    
+    def _emit(self, level: str, kind: str, message: str, render: Callable[[float], str]) -> None:
+        """
+        Write a message, or queue it in 'queue' mode
+        
+        Rendering (colors, icons, JSON) is deferred to `render`, which runs on the
+        writer thread in 'queue' mode, so the caller only pays for the level check.
+        """
+        if LEVELS[level] < self.minLevel:
+            return
+        record = (level, kind, message, render, time.time())
+        if self._queue is None:
+            self._write(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._droppedLock:
+                self.droppedCount += 1
+    
+    def _write(self, record: tuple) -> None:
+        level, kind, message, render, timestamp = record
+        if self.jsonOutput:
+            if kind == 'separator':
+                return
+            text = json.dumps({
+                'time': datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds'),
+                'level': level,
+                'kind': kind,
+                'message': message.strip()
+            }, ensure_ascii=False)
+        else:
+            text = render(timestamp)
+        print(text, file=self.stream or sys.stdout)
+    
+    def _writeQueued(self) -> None:
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+                self._write(record)
+                with self._droppedLock:
+                    dropped, self.droppedCount = self.droppedCount, 0
+                if dropped:
+                    print(f"... {dropped} log messages dropped, the log queue was full", file=self.stream or sys.stdout)
+            except Exception:
+                pass
+            finally:
+                self._queue.task_done()
     
     def _applyColor(self, text: str, color: str) -> str:
         """Apply color to text if colors are enabled"""
@@ -58,82 +169,60 @@ class PrintStyler:
             return text
         return f"{icon} {text}"
     
+    def _styled(self, message: str, icon: Optional[str], color: str, withTimestamp: bool = False) -> Callable[[float], str]:
+        """Renderer for a message with an icon, a color and an optional timestamp"""
+        def render(timestamp: float) -> str:
+            text = self._addIcon(icon, message) if icon else message
+            text = self._applyColor(text, color)
+            if withTimestamp:
+                text = self._addTimestamp(text, timestamp)
+            return text
+        return render
+    
     def success(self, message: str, withTimestamp: bool = False) -> None:
         """Print success message with green color and check icon"""
-        text = self._addIcon(Icons.SUCCESS, message)
-        text = self._applyColor(text, Colors.GREEN)
-        if withTimestamp:
-            text = self._addTimestamp(text)
-        print(text)
+        self._emit('SUCCESS', 'success', message, self._styled(message, Icons.SUCCESS, Colors.GREEN, withTimestamp))
     
     def error(self, message: str, withTimestamp: bool = False) -> None:
         """Print error message with red color and error icon"""
-        text = self._addIcon(Icons.ERROR, message)
-        text = self._applyColor(text, Colors.RED)
-        if withTimestamp:
-            text = self._addTimestamp(text)
-        print(text)
+        self._emit('ERROR', 'error', message, self._styled(message, Icons.ERROR, Colors.RED, withTimestamp))
     
     def warning(self, message: str, withTimestamp: bool = False) -> None:
         """Print warning message with yellow color and warning icon"""
-        text = self._addIcon(Icons.WARNING, message)
-        text = self._applyColor(text, Colors.YELLOW)
-        if withTimestamp:
-            text = self._addTimestamp(text)
-        print(text)
+        self._emit('WARNING', 'warning', message, self._styled(message, Icons.WARNING, Colors.YELLOW, withTimestamp))
     
     def info(self, message: str, withTimestamp: bool = False) -> None:
         """Print info message with blue color and info icon"""
-        text = self._addIcon(Icons.INFO, message)
-        text = self._applyColor(text, Colors.BLUE)
-        if withTimestamp:
-            text = self._addTimestamp(text)
-        print(text)
+        self._emit('INFO', 'info', message, self._styled(message, Icons.INFO, Colors.BLUE, withTimestamp))
     
     def loading(self, message: str) -> None:
         """Print loading message with cyan color and loading icon"""
-        text = self._addIcon(Icons.LOADING, message)
-        text = self._applyColor(text, Colors.CYAN)
-        print(text)
+        self._emit('INFO', 'loading', message, self._styled(message, Icons.LOADING, Colors.CYAN))
     
     def ping(self, message: str) -> None:
         """Print ping-related message with cyan color and ping icon"""
-        text = self._addIcon(Icons.PING, message)
-        text = self._applyColor(text, Colors.CYAN)
-        print(text)
+        self._emit('INFO', 'ping', message, self._styled(message, Icons.PING, Colors.CYAN))
     
     def power(self, message: str, isOn: bool = True) -> None:
         """Print power-related message with appropriate color"""
-        text = self._addIcon(Icons.POWER, message)
         color = Colors.GREEN if isOn else Colors.RED
-        text = self._applyColor(text, color)
-        print(text)
+        self._emit('INFO', 'power', message, self._styled(message, Icons.POWER, color))
     
     def network(self, message: str, isConnected: bool = True) -> None:
         """Print network-related message with appropriate color"""
-        text = self._addIcon(Icons.NETWORK, message)
         color = Colors.GREEN if isConnected else Colors.RED
-        text = self._applyColor(text, color)
-        print(text)
+        self._emit('INFO', 'network', message, self._styled(message, Icons.NETWORK, color))
     
     def bot(self, message: str) -> None:
         """Print bot-related message with purple color and bot icon"""
-        text = self._addIcon(Icons.BOT, message)
-        text = self._applyColor(text, Colors.PURPLE)
-        print(text)
+        self._emit('INFO', 'bot', message, self._styled(message, Icons.BOT, Colors.PURPLE))
     
     def custom(self, message: str, color: str = Colors.WHITE, icon: Optional[str] = None) -> None:
         """Print custom message with specified color and icon"""
-        text = message
-        if icon:
-            text = self._addIcon(icon, text)
-        text = self._applyColor(text, color)
-        print(text)
+        self._emit('INFO', 'custom', message, self._styled(message, icon, color))
     
     def log(self, level: str, message: str) -> None:
         """Print log-style message with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
         levelColors = {
             'DEBUG': Colors.DIM,
             'INFO': Colors.BLUE,
@@ -150,42 +239,39 @@ class PrintStyler:
             'SUCCESS': Icons.SUCCESS
         }
         
-        color = levelColors.get(level.upper(), Colors.WHITE)
-        icon = levelIcons.get(level.upper(), '•')
+        level = level.upper()
         
-        text = f"[{timestamp}] {level.upper()}: {message}"
-        if self.enableIcons:
-            text = f"{icon} {text}"
-        text = self._applyColor(text, color)
-        print(text)
+        def render(timestamp: float) -> str:
+            color = levelColors.get(level, Colors.WHITE)
+            icon = levelIcons.get(level, '•')
+            
+            text = f"[{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')}] {level}: {message}"
+            if self.enableIcons:
+                text = f"{icon} {text}"
+            return self._applyColor(text, color)
+        
+        self._emit(level if level in LEVELS else 'INFO', 'log', message, render)
     
-    def _addTimestamp(self, text: str) -> str:
+    def _addTimestamp(self, text: str, timestamp: Optional[float] = None) -> str:
         """Add timestamp to text"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        return f"[{timestamp}] {text}"
+        moment = datetime.fromtimestamp(timestamp) if timestamp is not None else datetime.now()
+        return f"[{moment.strftime('%H:%M:%S')}] {text}"
     
     def printBox(self, message: str, color: str = Colors.WHITE) -> None:
         """Print message in a box"""
-        border = "─" * (len(message) + 2)
-        boxTop = f"┌{border}┐"
-        boxMiddle = f"│ {message} │"
-        boxBottom = f"└{border}┘"
-        
-        if self.enableColors:
-            boxTop = self._applyColor(boxTop, color)
-            boxMiddle = self._applyColor(boxMiddle, color)
-            boxBottom = self._applyColor(boxBottom, color)
+        def render(timestamp: float) -> str:
+            border = "─" * (len(message) + 2)
+            lines = [f"┌{border}┐", f"│ {message} │", f"└{border}┘"]
+            if self.enableColors:
+                lines = [self._applyColor(line, color) for line in lines]
+            return "\n".join(lines)
         
-        print(boxTop)
-        print(boxMiddle)
-        print(boxBottom)
+        self._emit('INFO', 'box', message, render)
     
     def printSeparator(self, character: str = "─", length: int = 50, color: str = Colors.DIM) -> None:
         """Print a separator line"""
-        separator = character * length
-        text = self._applyColor(separator, color)
-        print(text)
+        self._emit('INFO', 'separator', '', lambda timestamp: self._applyColor(character * length, color))
 
 
 # Create a global instance for easy usage
-styler = PrintStyler()
\ No newline at end of file
+styler = PrintStyler()
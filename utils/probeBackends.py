@@ -0,0 +1,308 @@
+import asyncio
+import itertools
+import os
+import socket
+import struct
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from .printStyler import styler
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+# Seconds between attempts, same as the default `ping` interval
+ATTEMPT_INTERVAL = 1.0
+
+
+class ProbeBackend:
+    """Base class for reachability probes"""
+    name = 'base'
+
+    async def probe(self, address: str, count: int, timeout: float, earlyExit: bool = True) -> bool:
+        """
+        Check if an address is reachable
+
+        Args:
+            address: IP address or hostname
+            count: Number of attempts
+            timeout: Seconds to wait for each attempt
+            earlyExit: Return as soon as the first attempt succeeds. The full
+                attempt budget is then only spent to confirm the host is down.
+
+        Returns:
+            bool: True if at least one attempt succeeded
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    async def _runAttempts(attempt: Callable[[], Awaitable[bool]], count: int, earlyExit: bool) -> bool:
+        """Start `count` attempts ATTEMPT_INTERVAL apart and combine their results"""
+        pending = set()
+        succeeded = False
+
+        try:
+            for index in range(count):
+                pending.add(asyncio.ensure_future(attempt()))
+                if index == count - 1:
+                    break
+
+                # Wait for the next send slot, picking up results that arrive meanwhile
+                deadline = time.monotonic() + ATTEMPT_INTERVAL
+                while pending and (remaining := deadline - time.monotonic()) > 0:
+                    done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                    succeeded = succeeded or any(task.result() for task in done)
+                    if succeeded and earlyExit:
+                        return True
+                if pending:
+                    continue
+                await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = succeeded or any(task.result() for task in done)
+                if succeeded and earlyExit:
+                    return True
+
+            return succeeded
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self) -> None:
+        pass
+
+
+class SubprocessPingBackend(ProbeBackend):
+    """Runs the system `ping` binary for every probe"""
+    name = 'subprocess'
+
+    async def probe(self, address: str, count: int, timeout: float, earlyExit: bool = True) -> bool:
+        result = await asyncio.create_subprocess_exec(
+            'ping', '-c', str(count), '-W', str(int(timeout)), address,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+
+        if not earlyExit:
+            await result.communicate()
+            return result.returncode == 0
+
+        # Every echo reply is printed as "... bytes from ...", stop at the first one
+        try:
+            async for line in result.stdout:
+                if b' bytes from ' in line:
+                    return True
+        finally:
+            if result.returncode is None:
+                try:
+                    result.kill()
+                except ProcessLookupError:
+                    pass
+            await result.wait()
+
+        return result.returncode == 0
+
+
+class IcmpProbeBackend(ProbeBackend):
+    """
+    Sends ICMP echo requests from one shared non-blocking socket.
+
+    Uses an unprivileged datagram ICMP socket when the kernel allows it
+    (net.ipv4.ping_group_range), otherwise a raw socket. Replies are matched
+    to requests by sequence number, so any number of targets can be probed
+    concurrently without forking a process per ping.
+    """
+    name = 'icmp'
+
+    def __init__(self):
+        self._socket: Optional[socket.socket] = None
+        self._isRaw = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._identifier = os.getpid() & 0xFFFF
+        self._sequence = itertools.count(1)
+        self._pending: Dict[int, Tuple[str, asyncio.Future]] = {}
+        self._resolved: Dict[str, str] = {}
+
+    @staticmethod
+    def openSocket() -> Tuple[socket.socket, bool]:
+        """
+        Open an ICMP socket, preferring the unprivileged datagram kind
+
+        Returns:
+            tuple: (socket, isRaw)
+
+        Raises:
+            OSError: If neither socket type is permitted
+        """
+        try:
+            return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+        except PermissionError:
+            return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+    def _ensureSocket(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._socket and self._loop is loop:
+            return
+
+        self.close()
+        self._socket, self._isRaw = self.openSocket()
+        self._socket.setblocking(False)
+        self._loop = loop
+        loop.add_reader(self._socket.fileno(), self._onReadable)
+        styler.info(f"ICMP probe socket opened ({'raw' if self._isRaw else 'datagram'})")
+
+    @staticmethod
+    def _checksum(data: bytes) -> int:
+        if len(data) % 2:
+            data += b'\x00'
+        total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        return ~total & 0xFFFF
+
+    def _buildPacket(self, sequence: int) -> bytes:
+        payload = struct.pack('!d', time.monotonic())
+        header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, self._identifier, sequence)
+        checksum = self._checksum(header + payload)
+        header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, self._identifier, sequence)
+        return header + payload
+
+    def _nextSequence(self) -> int:
+        while True:
+            sequence = next(self._sequence) & 0xFFFF
+            if sequence and sequence not in self._pending:
+                return sequence
+
+    def _onReadable(self) -> None:
+        while True:
+            try:
+                data, (sourceAddress, _) = self._socket.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                styler.error(f"ICMP receive failed: {e}")
+                return
+
+            if self._isRaw:
+                # Raw sockets deliver the IP header as well
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8:
+                continue
+
+            icmpType, _, _, identifier, sequence = struct.unpack('!BBHHH', data[:8])
+            if icmpType != ICMP_ECHO_REPLY:
+                continue
+            # Datagram sockets get their identifier rewritten by the kernel
+            if self._isRaw and identifier != self._identifier:
+                continue
+
+            pending = self._pending.get(sequence)
+            if pending and pending[0] == sourceAddress and not pending[1].done():
+                pending[1].set_result(True)
+
+    async def _resolve(self, address: str) -> str:
+        if address not in self._resolved:
+            infos = await self._loop.getaddrinfo(address, None, family=socket.AF_INET)
+            self._resolved[address] = infos[0][4][0]
+        return self._resolved[address]
+
+    async def _echo(self, address: str, timeout: float) -> bool:
+        sequence = self._nextSequence()
+        future = self._loop.create_future()
+        self._pending[sequence] = (address, future)
+
+        try:
+            self._socket.sendto(self._buildPacket(sequence), (address, 0))
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, OSError):
+            return False
+        finally:
+            self._pending.pop(sequence, None)
+
+    async def probe(self, address: str, count: int, timeout: float, earlyExit: bool = True) -> bool:
+        self._ensureSocket()
+        try:
+            ip = await self._resolve(address)
+        except OSError:
+            return False
+
+        return await self._runAttempts(lambda: self._echo(ip, timeout), count, earlyExit)
+
+    def close(self) -> None:
+        if self._socket:
+            if self._loop and not self._loop.is_closed():
+                self._loop.remove_reader(self._socket.fileno())
+            self._socket.close()
+        self._socket = None
+        self._loop = None
+        self._pending.clear()
+
+
+class TcpProbeBackend(ProbeBackend):
+    """
+    Treats a host as reachable if any of the ports answers a TCP handshake.
+
+    A refused connection also counts: the host had to be up to send the RST.
+    """
+    name = 'tcp'
+
+    def __init__(self, ports: Optional[List[int]] = None):
+        self.ports = ports or [80, 443, 22]
+
+    async def _connect(self, address: str, port: int, timeout: float) -> bool:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        except ConnectionRefusedError:
+            return True
+        except (asyncio.TimeoutError, OSError):
+            return False
+
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    async def _attempt(self, address: str, timeout: float) -> bool:
+        tasks = [asyncio.ensure_future(self._connect(address, port, timeout)) for port in self.ports]
+        try:
+            for task in asyncio.as_completed(tasks):
+                if await task:
+                    return True
+            return False
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def probe(self, address: str, count: int, timeout: float, earlyExit: bool = True) -> bool:
+        return await self._runAttempts(lambda: self._attempt(address, timeout), count, earlyExit)
+
+
+def createProbeBackend(name: str, tcpPorts: Optional[List[int]] = None) -> ProbeBackend:
+    """
+    Create a probe backend by name
+
+    Args:
+        name: 'auto', 'icmp', 'tcp' or 'subprocess'. 'auto' uses ICMP when
+            the process may open an ICMP socket and falls back to TCP.
+        tcpPorts: Ports for the TCP backend
+
+    Returns:
+        ProbeBackend: Backend instance
+    """
+    if name == 'subprocess':
+        return SubprocessPingBackend()
+    if name == 'tcp':
+        return TcpProbeBackend(tcpPorts)
+    if name == 'icmp':
+        return IcmpProbeBackend()
+    if name != 'auto':
+        raise ValueError(f"Unknown probe backend: {name}")
+
+    try:
+        probeSocket, _ = IcmpProbeBackend.openSocket()
+        probeSocket.close()
+        return IcmpProbeBackend()
+    except OSError as e:
+        styler.warning(f"ICMP sockets are not available ({e}), falling back to TCP probes")
+        return TcpProbeBackend(tcpPorts)
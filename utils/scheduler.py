@@ -0,0 +1,197 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from .printStyler import styler
+from .metrics import tickLag
+
+# What a probe job reports back, drives the adaptive interval
+ACTIVITY_STABLE = 'stable'
+ACTIVITY_PENDING = 'pending'
+ACTIVITY_CHANGED = 'changed'
+
+MISSED_TICKS_SKIP = 'skip'
+MISSED_TICKS_COALESCE = 'coalesce'
+
+
+@dataclass
+class ScheduleSettings:
+    """
+    intervalSeconds: Regular time between probes of a target
+    fastIntervalSeconds: Interval right after a state change
+    maxIntervalSeconds: Interval a stable target backs off to
+    backoffFactor: Interval growth per stable probe
+    pendingIntervalSeconds: Interval while a state change waits for confirmation
+    jitterSeconds: Random delay up to this value added to every tick, spreads targets apart
+    missedTicks: 'skip' drops ticks missed while a probe ran late,
+        'coalesce' runs one catch-up probe right away for all of them
+    """
+    intervalSeconds: float = 30
+    fastIntervalSeconds: Optional[float] = None
+    maxIntervalSeconds: Optional[float] = None
+    backoffFactor: float = 1.5
+    pendingIntervalSeconds: float = 5
+    jitterSeconds: float = 0
+    missedTicks: str = MISSED_TICKS_SKIP
+
+    def __post_init__(self):
+        if self.fastIntervalSeconds is None:
+            self.fastIntervalSeconds = self.intervalSeconds
+        if self.maxIntervalSeconds is None:
+            self.maxIntervalSeconds = self.intervalSeconds
+        if self.missedTicks not in (MISSED_TICKS_SKIP, MISSED_TICKS_COALESCE):
+            raise ValueError(f"Unknown missed ticks policy: {self.missedTicks}")
+
+
+class _Entry:
+    def __init__(self, key: str, item, interval: float, tickAt: float):
+        self.key = key
+        self.item = item
+        self.interval = interval
+        # Tick on the fixed-rate grid, without jitter
+        self.tickAt = tickAt
+        self.fireAt = tickAt
+        self.running = False
+
+
+class ProbeScheduler:
+    """
+    Runs a probe job for many items, each on its own fixed-rate grid of the
+    monotonic clock, so wall clock jumps and slow probes do not make ticks drift.
+
+    Ticks are kept in a heap ordered by due time. A job never overlaps with
+    itself for the same item, and at most `maxConcurrent` jobs run at once.
+    """
+
+    def __init__(self, job: Callable[[object], Awaitable[str]], settings: ScheduleSettings, maxConcurrent: int = 10,
+                 keyFunc: Callable[[object], str] = str):
+        self.job = job
+        self.settings = settings
+        self.keyFunc = keyFunc
+        self.maxConcurrent = maxConcurrent
+        self._semaphore = asyncio.Semaphore(maxConcurrent)
+        self._entries: Dict[str, _Entry] = {}
+        self._heap: List[tuple] = []
+        self._order = itertools.count()
+        self._wakeUp = asyncio.Event()
+        self._tasks = set()
+
+    def setItems(self, items: list) -> None:
+        """Set the items to probe. New items are due at once, removed ones stop."""
+        now = time.monotonic()
+        keys = set()
+        for item in items:
+            key = self.keyFunc(item)
+            keys.add(key)
+            if key in self._entries:
+                self._entries[key].item = item
+            else:
+                entry = _Entry(key, item, self.settings.intervalSeconds, now)
+                self._entries[key] = entry
+                self._push(entry)
+
+        for key in list(self._entries):
+            if key not in keys:
+                del self._entries[key]
+        self._wakeUp.set()
+
+    def updateSettings(self, settings: ScheduleSettings) -> None:
+        """
+        Switch to new settings while running. Intervals above the new maximum
+        are cut down and ticks that are now too far away are moved closer.
+        """
+        self.settings = settings
+        now = time.monotonic()
+        for entry in self._entries.values():
+            entry.interval = min(entry.interval, settings.maxIntervalSeconds)
+            if not entry.running and entry.tickAt > now + entry.interval:
+                # The old heap item is skipped, its fireAt no longer matches
+                entry.tickAt = now + entry.interval
+                self._push(entry)
+        self._wakeUp.set()
+
+    def setMaxConcurrent(self, maxConcurrent: int) -> None:
+        """Change the concurrency limit, jobs already running finish under the old one"""
+        if maxConcurrent != self.maxConcurrent:
+            self.maxConcurrent = maxConcurrent
+            self._semaphore = asyncio.Semaphore(maxConcurrent)
+
+    def _push(self, entry: _Entry) -> None:
+        entry.fireAt = entry.tickAt + random.uniform(0, self.settings.jitterSeconds)
+        heapq.heappush(self._heap, (entry.fireAt, next(self._order), entry.key))
+
+    def _nextInterval(self, entry: _Entry, activity: str) -> float:
+        settings = self.settings
+        if activity == ACTIVITY_CHANGED:
+            return settings.fastIntervalSeconds
+        if activity == ACTIVITY_PENDING:
+            return min(entry.interval, settings.pendingIntervalSeconds)
+        return min(settings.maxIntervalSeconds, entry.interval * settings.backoffFactor)
+
+    def _reschedule(self, entry: _Entry, activity: str) -> None:
+        # Fixed rate: the next tick is counted from the previous tick, not from
+        # when the probe finished. A new interval starts its grid there as well.
+        interval = entry.interval = self._nextInterval(entry, activity)
+        entry.tickAt += interval
+
+        now = time.monotonic()
+        if entry.tickAt < now:
+            missed = int((now - entry.tickAt) // interval) + 1
+            if self.settings.missedTicks == MISSED_TICKS_SKIP:
+                entry.tickAt += missed * interval
+                styler.warning(f"{entry.key}: probe ran late, skipped {missed} tick(s)")
+            else:
+                # One catch-up probe now, then back on the grid
+                styler.warning(f"{entry.key}: probe ran late, coalescing {missed} missed tick(s) into one")
+                entry.tickAt += (missed - 1) * interval
+        self._push(entry)
+
+    async def _runJob(self, entry: _Entry) -> None:
+        activity = ACTIVITY_STABLE
+        try:
+            async with self._semaphore:
+                lag = time.monotonic() - entry.fireAt
+                tickLag.observe(max(0.0, lag))
+                if lag > 1:
+                    styler.warning(f"{entry.key}: probe started {lag:.1f}s late")
+                activity = await self.job(entry.item)
+        except Exception as e:
+            styler.error(f"Probe of {entry.key} failed: {e}")
+        finally:
+            entry.running = False
+            if self._entries.get(entry.key) is entry:
+                self._reschedule(entry, activity)
+                self._wakeUp.set()
+
+    async def run(self, durationSeconds: Optional[float] = None) -> None:
+        """
+        Run until cancelled or for `durationSeconds`
+        """
+        endAt = time.monotonic() + durationSeconds if durationSeconds else None
+        try:
+            while endAt is None or time.monotonic() < endAt:
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    fireAt, _, key = heapq.heappop(self._heap)
+                    entry = self._entries.get(key)
+                    if entry is None or entry.running or entry.fireAt != fireAt:
+                        continue
+                    entry.running = True
+                    task = asyncio.create_task(self._runJob(entry))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                timeout = self._heap[0][0] - now if self._heap else None
+                if endAt is not None:
+                    timeout = min(timeout, endAt - now) if timeout is not None else endAt - now
+                self._wakeUp.clear()
+                try:
+                    await asyncio.wait_for(self._wakeUp.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
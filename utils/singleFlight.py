@@ -0,0 +1,37 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """
+    Merges concurrent calls for the same key into one in-flight call and
+    hands its result to every caller. A result is reused for `ttlSeconds`
+    after it arrived; failures are not cached.
+    """
+
+    def __init__(self, ttlSeconds: float = 10):
+        self.ttlSeconds = ttlSeconds
+        self._inFlight: Dict[str, asyncio.Future] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a fresh cached result for `key`, join the call in flight, or start `func`"""
+        cached = self._results.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttlSeconds:
+            return cached[1]
+
+        future = self._inFlight.get(key)
+        if future is None:
+            future = self._inFlight[key] = asyncio.ensure_future(func())
+            future.add_done_callback(lambda done: self._finish(key, done))
+        # One caller giving up must not cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _finish(self, key: str, future: asyncio.Future) -> None:
+        self._inFlight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._results[key] = (time.monotonic(), future.result())
+
+    def forget(self, key: str) -> None:
+        self._results.pop(key, None)
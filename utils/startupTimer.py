@@ -0,0 +1,58 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+from .printStyler import styler
+
+
+class StartupTimer:
+    """
+    Collects how long startup steps take, measured from when this module was
+    imported (main.py imports it first), and logs them as one report.
+
+    Steps are either timed blocks (`measure`, e.g. an import) or milestones
+    (`mark`, e.g. the first probe finishing); a milestone is recorded once.
+    """
+
+    def __init__(self):
+        self.startTime = time.perf_counter()
+        self._durations: Dict[str, float] = {}
+        self._milestones: Dict[str, float] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def _event(self, name: str) -> asyncio.Event:
+        if name not in self._events:
+            self._events[name] = asyncio.Event()
+        return self._events[name]
+
+    @contextmanager
+    def measure(self, name: str):
+        """Time a block, e.g. `with startupTimer.measure('import telegram'):`"""
+        blockStartTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._durations[name] = time.perf_counter() - blockStartTime
+
+    def mark(self, name: str) -> None:
+        """Record that a milestone was reached, only the first time"""
+        if name in self._milestones:
+            return
+        self._milestones[name] = time.perf_counter() - self.startTime
+        self._event(name).set()
+
+    async def waitFor(self, *names: str) -> None:
+        for name in names:
+            await self._event(name).wait()
+
+    def lines(self) -> List[str]:
+        lines = [f"{name}: {duration * 1000:.0f} ms" for name, duration in self._durations.items()]
+        lines += [f"{name} after {elapsed * 1000:.0f} ms"
+                  for name, elapsed in sorted(self._milestones.items(), key=lambda item: item[1])]
+        return lines
+
+    def report(self) -> None:
+        styler.info("Startup timing: " + "; ".join(self.lines()))
+
+
+startupTimer = StartupTimer()